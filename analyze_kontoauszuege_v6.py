@@ -9,15 +9,36 @@ Version 6: Perfektionierte Extraktion basierend auf Analyse aller 5 Dokumente
 import json
 import sys
 import re
+import asyncio
+import hashlib
+import functools
+import httpx
 from pathlib import Path
 import ollama
 from typing import Dict, Any, List, Optional, Tuple
 import logging
-from decimal import Decimal
+from decimal import Decimal, InvalidOperation
+
+# Optional: orjson für schnellere JSON-Serialisierung
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: HTTP/2 (Paket h2) - alle Anfragen teilen sich dann eine Verbindung
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# WKN (6 Zeichen) und ISIN (12 Zeichen) setzen beide eine Folge aus mindestens
+# 6 Großbuchstaben/Ziffern voraus - ohne diese sind beide Regex-Suchen zwecklos
+_HAS_CAPS_RUN = re.compile(r'[A-Z0-9]{6}')
+
 
 def parse_german_amount(amount_str: str) -> Decimal:
     """Konvertiert deutschen Betrag zu Decimal"""
@@ -29,7 +50,7 @@ def parse_german_amount(amount_str: str) -> Decimal:
     
     try:
         return Decimal(amount_str)
-    except:
+    except (InvalidOperation, ValueError):
         logger.warning(f"Konnte Betrag nicht parsen: {amount_str}")
         return Decimal('0')
 
@@ -51,6 +72,14 @@ def extract_valuta_date(description: str) -> Optional[str]:
 
 def classify_transaction_type(description: str, betrag: Decimal) -> str:
     """Klassifiziert Transaktionsart basierend auf Beschreibung"""
+    # Für die Klassifikation zählt nur das Vorzeichen des Betrags
+    sign = 1 if betrag > 0 else -1 if betrag < 0 else 0
+    return _classify_transaction_type(description, sign)
+
+
+@functools.lru_cache(maxsize=4096)
+def _classify_transaction_type(description: str, sign: int) -> str:
+    """Gecachte Klassifikation nach (Beschreibung, Vorzeichen)"""
     desc_lower = description.lower()
     
     # Detaillierte Klassifikation
@@ -64,7 +93,7 @@ def classify_transaction_type(description: str, betrag: Decimal) -> str:
     elif 'durchlfd' in desc_lower and 'sperrbetr' in desc_lower:
         return 'Wertpapier-Sperrbeträge'
     elif 'überweisung' in desc_lower or 'übertrag' in desc_lower:
-        return 'Überweisung ausgehend' if betrag < 0 else 'Überweisung eingehend'
+        return 'Überweisung ausgehend' if sign < 0 else 'Überweisung eingehend'
     elif 'gutschriftseingang' in desc_lower:
         return 'Gutschrift'
     elif 'lastschr' in desc_lower:
@@ -78,7 +107,7 @@ def classify_transaction_type(description: str, betrag: Decimal) -> str:
             return 'Verwahrentgelt'
         else:
             return 'Abrechnung'
-    elif betrag > 0:
+    elif sign > 0:
         return 'Eingang'
     else:
         return 'Ausgang'
@@ -90,15 +119,17 @@ def extract_wkn_isin(description: str) -> Tuple[Optional[str], Optional[str], Op
     isin = None
     name = None
     
-    # WKN
-    wkn_match = re.search(r'WKN\s+([A-Z0-9]{6})', description)
-    if wkn_match:
-        wkn = wkn_match.group(1)
-    
-    # ISIN
-    isin_match = re.search(r'([A-Z]{2}[A-Z0-9]{10})', description)
-    if isin_match:
-        isin = isin_match.group(1)
+    # Vorfilter: die meisten Buchungen (Entgelt, Lastschrift, ...) haben keine WKN/ISIN
+    if _HAS_CAPS_RUN.search(description):
+        # WKN
+        wkn_match = re.search(r'WKN\s+([A-Z0-9]{6})', description)
+        if wkn_match:
+            wkn = wkn_match.group(1)
+        
+        # ISIN
+        isin_match = re.search(r'([A-Z]{2}[A-Z0-9]{10})', description)
+        if isin_match:
+            isin = isin_match.group(1)
     
     # Wertpapiername (Tesla, etc.)
     if 'TESLA INC' in description.upper():
@@ -107,12 +138,52 @@ def extract_wkn_isin(description: str) -> Tuple[Optional[str], Optional[str], Op
     return wkn, isin, name
 
 
-def ask_llm_v6_analysis(json_file: str, 
-                        ollama_url: str = "https://fs.aiora.rest",
-                        model: str = "qwen3:8b") -> Dict[str, Any]:
+def auszug_nummer_as_int(value: Any) -> int:
+    """Auszugsnummer als int (0 wenn nicht interpretierbar)"""
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def content_hash(doc_text: str) -> str:
+    """Schneller Inhalts-Hash zur Erkennung identischer Dokumente"""
+    return hashlib.blake2b(doc_text.encode('utf-8'), digest_size=16).hexdigest()
+
+
+# Großzügig für Modell-Laden und lange Antworten, aber endlich: eine hängende
+# Anfrage wird zum Fehler dieser Datei statt den ganzen Lauf zu blockieren
+LLM_TIMEOUT = httpx.Timeout(900.0, connect=10.0)
+
+
+def new_http_client() -> httpx.AsyncClient:
+    """AsyncClient für die Ollama API (HTTP/2 wenn verfügbar)"""
+    return httpx.AsyncClient(http2=HTTP2_AVAILABLE, timeout=LLM_TIMEOUT)
+
+
+def _loads_json(data: Any) -> Any:
+    """Parst JSON (bytes oder str), mit orjson wenn verfügbar"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+async def ask_llm_v6_analysis(json_file: str, 
+                              ollama_url: str = "https://fs.aiora.rest",
+                              model: str = "qwen3:8b",
+                              cache: Optional[Dict[str, "asyncio.Future"]] = None,
+                              client: Optional[httpx.AsyncClient] = None) -> Dict[str, Any]:
     """
     Version 6: Perfektionierte Extraktion mit Schritt-für-Schritt Logik
+    
+    Mit `cache` (Inhalts-Hash -> laufende/fertige Analyse) werden Dateien mit
+    identischem Text nur einmal an das LLM geschickt, auch wenn die Anfragen
+    parallel laufen. `client` wird für alle Anfragen wiederverwendet.
     """
+    if client is None:
+        async with new_http_client() as client:
+            return await ask_llm_v6_analysis(json_file, ollama_url, model, cache, client)
+    
     logger.info(f"Analysiere V6 (perfektioniert): {json_file}")
     
     # JSON laden
@@ -121,7 +192,26 @@ def ask_llm_v6_analysis(json_file: str,
     
     # Text für Analyse
     doc_text = content.get("text", "")[:20000]
+    datei = Path(json_file).name
+    
+    if cache is None:
+        return await _analyse_text_v6(doc_text, datei, client, ollama_url, model)
     
+    # Duplikate (gleicher Inhalt, anderer Dateiname) wiederverwenden
+    key = content_hash(doc_text)
+    pending = cache.get(key)
+    if pending is None:
+        pending = cache[key] = asyncio.ensure_future(
+            _analyse_text_v6(doc_text, datei, client, ollama_url, model))
+        return await pending
+    
+    logger.info("Inhalt identisch mit bereits analysiertem Dokument - verwende Ergebnis wieder")
+    return {**(await pending), "datei": datei}
+
+
+async def _analyse_text_v6(doc_text: str, datei: str, client: httpx.AsyncClient,
+                           ollama_url: str, model: str) -> Dict[str, Any]:
+    """Schickt den Dokumenttext an Ollama (/api/chat) und validiert die Antwort"""
     # Strukturierter Prompt für V6
     question = """SCHRITT-FÜR-SCHRITT ANLEITUNG FÜR DEUTSCHE KONTOAUSZÜGE:
 
@@ -183,7 +273,7 @@ Kontostand am 30.06.2022 um 20:02 Uhr 450.104,01   ← ENDSALDO
 
 Antworte im JSON Format:
 {{
-    "datei": "{Path(json_file).name}",
+    "datei": "{datei}",
     "schritt1_auszugsnummer": "Extrahiere aus 'Kontoauszug X/2022'",
     "auszug_nummer": "5",  // Beispiel für Auszug 5/2022
     "kontodaten": {{
@@ -239,16 +329,12 @@ EXTREM WICHTIG für jeden Auszug:
 - Endsaldo hat KEINE Auszugsnummer
 - NUR echte Transaktionen zwischen den Salden zählen"""
     
-    try:
-        client = ollama.Client(host=ollama_url)
-        
-        logger.info(f"Sende V6 Anfrage mit Schritt-für-Schritt Logik...")
-        response = client.chat(
-            model=model,
-            messages=[
-                {
-                    "role": "system",
-                    "content": """Du bist ein deutscher Bankprüfer. KRITISCHE REGELN:
+    payload = {
+        "model": model,
+        "messages": [
+            {
+                "role": "system",
+                "content": """Du bist ein deutscher Bankprüfer. KRITISCHE REGELN:
 
 1. AUSZUGSNUMMER: Aus "Kontoauszug X/2022" in Kopfzeile
 2. ANFANGSSALDO: "Kontostand am [Datum], Auszug Nr. [X-1]" (VORHERIGE Nummer!)
@@ -261,88 +347,98 @@ BEISPIEL AUSZUG 5/2022:
 - Anfang: "Kontostand am 31.05.2022, Auszug Nr. 4 450.105,96" (Nr. 4!)
 - Ende: "Kontostand am 30.06.2022 um 20:02 Uhr 450.104,01"
 - Transaktionen: NUR 1 (-1,95 EUR)"""
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ],
-            format="json",
-            options={
-                "temperature": 0.01,
-                "top_p": 1.0,
-                "num_predict": 8192
+            },
+            {
+                "role": "user",
+                "content": prompt
             }
-        )
-        
-        if response and 'message' in response:
-            try:
-                result = json.loads(response['message']['content'])
-                
-                # Nachbearbeitung und erweiterte Validierung
-                if 'transaktionen' in result:
-                    for trans in result['transaktionen']:
-                        # Valuta extrahieren
-                        if not trans.get('valuta') and 'beschreibung' in trans:
-                            trans['valuta'] = extract_valuta_date(trans['beschreibung'])
-                        
-                        # Transaktionsart verfeinern
-                        if 'beschreibung' in trans and 'betrag' in trans:
-                            betrag = Decimal(str(trans['betrag']))
-                            trans['art'] = classify_transaction_type(trans['beschreibung'], betrag)
-                        
-                        # WKN/ISIN/Name
-                        if 'beschreibung' in trans:
-                            wkn, isin, name = extract_wkn_isin(trans['beschreibung'])
-                            if wkn or isin or name:
-                                trans['wertpapier'] = {}
-                                if wkn:
-                                    trans['wertpapier']['wkn'] = wkn
-                                if isin:
-                                    trans['wertpapier']['isin'] = isin
-                                if name:
-                                    trans['wertpapier']['name'] = name
-                
-                # Python-Validierung
-                try:
-                    anfang = Decimal(str(result.get('anfangssaldo', {}).get('betrag', 0)))
-                    ende = Decimal(str(result.get('endsaldo', {}).get('betrag', 0)))
-                    
-                    trans_summe = Decimal('0')
-                    for trans in result.get('transaktionen', []):
-                        trans_summe += Decimal(str(trans.get('betrag', 0)))
-                    
-                    berechnet = anfang + trans_summe
-                    differenz = ende - berechnet
-                    
-                    result['python_validierung'] = {
-                        'anfangssaldo': float(anfang),
-                        'endsaldo_aus_dokument': float(ende),
-                        'transaktionen_summe': float(trans_summe),
-                        'berechneter_endsaldo': float(berechnet),
-                        'differenz': float(differenz),
-                        'validierung_ok': abs(differenz) < Decimal('0.01'),
-                        'formel': f"{anfang:.2f} + {trans_summe:.2f} = {berechnet:.2f}"
-                    }
-                    
-                    if abs(differenz) < Decimal('0.01'):
-                        logger.info(f"✅ V6 Saldenprüfung erfolgreich: {result['python_validierung']['formel']}")
-                    else:
-                        logger.warning(f"⚠️ V6 Saldendifferenz: {differenz:.2f} EUR")
-                        
-                except Exception as e:
-                    result['python_validierung'] = {'fehler': str(e)}
-                
-                logger.info("✓ V6 Analyse abgeschlossen")
-                return result
-                
-            except json.JSONDecodeError as e:
-                logger.warning(f"JSON Parsing fehlgeschlagen: {e}")
-                return {"datei": Path(json_file).name, "fehler": "JSON Parsing Error"}
+        ],
+        "format": "json",
+        "stream": False,
+        "options": {
+            "temperature": 0.01,
+            "top_p": 1.0,
+            "num_predict": 8192
+        }
+    }
     
-    except Exception as e:
+    try:
+        logger.info("Sende V6 Anfrage mit Schritt-für-Schritt Logik...")
+        response = await client.post(f"{ollama_url.rstrip('/')}/api/chat", json=payload)
+        response.raise_for_status()
+        response = _loads_json(response.content)
+    except (httpx.HTTPError, json.JSONDecodeError) as e:
         logger.error(f"Fehler bei LLM Anfrage: {e}")
-        return {"datei": Path(json_file).name, "fehler": str(e)}
+        return {"datei": datei, "fehler": str(e)}
+    
+    if not response or 'message' not in response:
+        return {"datei": datei, "fehler": "Keine Antwort vom LLM"}
+    
+    try:
+        result = _loads_json(response['message']['content'])
+    except json.JSONDecodeError as e:
+        logger.warning(f"JSON Parsing fehlgeschlagen: {e}")
+        return {"datei": datei, "fehler": "JSON Parsing Error"}
+    
+    # Nachbearbeitung und erweiterte Validierung
+    if 'transaktionen' in result:
+        for trans in result['transaktionen']:
+            if not isinstance(trans, dict):
+                continue
+            
+            # Valuta extrahieren
+            if not trans.get('valuta') and 'beschreibung' in trans:
+                trans['valuta'] = extract_valuta_date(trans['beschreibung'])
+            
+            # Transaktionsart verfeinern
+            if 'beschreibung' in trans and 'betrag' in trans:
+                betrag = parse_german_amount(trans['betrag'])
+                trans['art'] = classify_transaction_type(trans['beschreibung'], betrag)
+            
+            # WKN/ISIN/Name
+            if 'beschreibung' in trans:
+                wkn, isin, name = extract_wkn_isin(trans['beschreibung'])
+                if wkn or isin or name:
+                    trans['wertpapier'] = {}
+                    if wkn:
+                        trans['wertpapier']['wkn'] = wkn
+                    if isin:
+                        trans['wertpapier']['isin'] = isin
+                    if name:
+                        trans['wertpapier']['name'] = name
+    
+    # Python-Validierung
+    try:
+        anfang = Decimal(str(result.get('anfangssaldo', {}).get('betrag', 0)))
+        ende = Decimal(str(result.get('endsaldo', {}).get('betrag', 0)))
+        
+        trans_summe = Decimal('0')
+        for trans in result.get('transaktionen', []):
+            trans_summe += Decimal(str(trans.get('betrag', 0)))
+        
+        berechnet = anfang + trans_summe
+        differenz = ende - berechnet
+        
+        result['python_validierung'] = {
+            'anfangssaldo': float(anfang),
+            'endsaldo_aus_dokument': float(ende),
+            'transaktionen_summe': float(trans_summe),
+            'berechneter_endsaldo': float(berechnet),
+            'differenz': float(differenz),
+            'validierung_ok': abs(differenz) < Decimal('0.01'),
+            'formel': f"{anfang:.2f} + {trans_summe:.2f} = {berechnet:.2f}"
+        }
+        
+        if abs(differenz) < Decimal('0.01'):
+            logger.info(f"✅ V6 Saldenprüfung erfolgreich: {result['python_validierung']['formel']}")
+        else:
+            logger.warning(f"⚠️ V6 Saldendifferenz: {differenz:.2f} EUR")
+            
+    except (InvalidOperation, ValueError, TypeError, AttributeError) as e:
+        result['python_validierung'] = {'fehler': str(e)}
+    
+    logger.info("✓ V6 Analyse abgeschlossen")
+    return result
 
 
 def validate_statement_continuity(analyses: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -352,10 +448,10 @@ def validate_statement_continuity(analyses: List[Dict[str, Any]]) -> Dict[str, A
     """
     continuity_check = []
     
-    # Sortiere nach Auszugsnummer
+    # Sortiere nach Auszugsnummer (sorted() wertet den Schlüssel nur einmal pro Eintrag aus)
     sorted_analyses = sorted(
         [a for a in analyses if 'fehler' not in a],
-        key=lambda x: int(x.get('auszug_nummer', 0))
+        key=lambda a: auszug_nummer_as_int(a.get('auszug_nummer'))
     )
     
     for i in range(len(sorted_analyses) - 1):
@@ -382,6 +478,35 @@ def validate_statement_continuity(analyses: List[Dict[str, Any]]) -> Dict[str, A
     }
 
 
+def _dumps_json(obj: Any) -> bytes:
+    """Serialisiert ein Objekt als eingerücktes UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2)
+    return json.dumps(obj, indent=2, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def write_analysis_json(output_file: str, header: Dict[str, Any],
+                        analyses: List[Dict[str, Any]], trailer: Dict[str, Any]) -> None:
+    """
+    Schreibt das Gesamtergebnis eintragsweise statt als ein großes Objekt:
+    {**header, "analysen": [...], **trailer}
+    
+    Jede Analyse wird einzeln serialisiert und direkt geschrieben, so dass nie
+    das komplette Ergebnis zusätzlich als String im Speicher liegt.
+    """
+    with open(output_file, 'wb') as f:
+        # Header ohne schließende Klammer
+        f.write(_dumps_json(header)[:-1].rstrip())
+        f.write(b',\n  "analysen": [\n')
+        for i, analysis in enumerate(analyses):
+            if i:
+                f.write(b',\n')
+            f.write(_dumps_json(analysis))
+        f.write(b'\n  ],')
+        # Trailer ohne öffnende Klammer
+        f.write(_dumps_json(trailer)[1:])
+
+
 def analyze_all_kontoauszuege_v6():
     """
     Version 6: Perfektionierte Analyse mit Schritt-für-Schritt Extraktion
@@ -403,17 +528,30 @@ def analyze_all_kontoauszuege_v6():
     
     print(f"Gefunden: {len(json_files)} Kontoauszüge für V6 Analyse\n")
     
-    all_analyses = []
+    # Alle Anfragen parallel über eine gemeinsame (HTTP/2-)Verbindung
+    async def analyze_parallel() -> List[Dict[str, Any]]:
+        analysis_cache: Dict[str, asyncio.Future] = {}
+        async with new_http_client() as client:
+            ergebnisse = await asyncio.gather(*(
+                ask_llm_v6_analysis(str(json_file), cache=analysis_cache, client=client)
+                for json_file in json_files
+            ), return_exceptions=True)
+        # Eine unerwartet geformte Antwort darf die übrigen Analysen nicht verwerfen
+        return [
+            {"datei": json_file.name, "fehler": str(ergebnis)}
+            if isinstance(ergebnis, BaseException) else ergebnis
+            for json_file, ergebnis in zip(json_files, ergebnisse)
+        ]
+    
+    print(f"Sende {len(json_files)} Anfragen parallel (HTTP/2: {'ja' if HTTP2_AVAILABLE else 'nein'})...")
+    all_analyses = asyncio.run(analyze_parallel())
     erfolgreiche = 0
     
-    for i, json_file in enumerate(json_files, 1):
+    for i, (json_file, analysis) in enumerate(zip(json_files, all_analyses), 1):
         print(f"\n{'='*70}")
         print(f"[{i}/{len(json_files)}] Verarbeite: {json_file.name}")
         print(f"{'='*70}")
         
-        analysis = ask_llm_v6_analysis(str(json_file))
-        all_analyses.append(analysis)
-        
         if "fehler" in analysis:
             print(f"❌ Fehler: {analysis['fehler']}")
         else:
@@ -470,8 +608,9 @@ def analyze_all_kontoauszuege_v6():
     
     # Speichern
     output_file = "kontoauszuege_analyse_komplett_v6.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump({
+    write_analysis_json(
+        output_file,
+        header={
             "version": "6.0",
             "beschreibung": "Perfektionierte Extraktion mit Schritt-für-Schritt Logik",
             "model": "qwen3:8b",
@@ -481,12 +620,15 @@ def analyze_all_kontoauszuege_v6():
                 "Kontinuitätsprüfung zwischen Auszügen",
                 "Erweiterte Transaktionsklassifikation",
                 "Präzise Beispiele für jeden Auszugstyp"
-            ],
-            "analysen": all_analyses,
+            ]
+        },
+        analyses=all_analyses,
+        trailer={
             "anzahl_dokumente": len(all_analyses),
             "erfolgreiche_pruefungen": erfolgreiche,
             "kontinuitaet": continuity
-        }, f, indent=2, ensure_ascii=False)
+        }
+    )
     
     print("\n" + "="*80)
     print(f"✅ ANALYSE V6 ABGESCHLOSSEN!")
@@ -9,83 +9,115 @@ Version 7: Korrigierte LLM-Summierung in schritt5_validierung
 import json
 import sys
 import re
+import asyncio
+import functools
+import hashlib
+import tempfile
 from pathlib import Path
 import ollama
 from typing import Dict, Any, List, Optional, Tuple
 import logging
-from decimal import Decimal
+from decimal import Context, Decimal, InvalidOperation, localcontext
 import argparse
+import os
+import httpx
+
+# Optional: ijson zum Streamen der (teils sehr großen) Docling-Ergebnisse
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional: orjson für schnellere JSON-Serialisierung
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-
-def parse_german_amount(amount_str: str) -> Decimal:
-    """Konvertiert deutschen Betrag zu Decimal - erkennt automatisch das Format"""
-    if isinstance(amount_str, (int, float)):
-        return Decimal(str(amount_str))
-        
-    amount_str = str(amount_str).replace('EUR', '').strip().replace('+', '').replace(' ', '')
+# Vorkompilierte Muster (werden pro Transaktion verwendet)
+_VALUTA_PATTERNS = [
+    re.compile(r'Wert:\s*(\d{2}\.\d{2}\.\d{4})'),
+    re.compile(r'Valuta:\s*(\d{2}\.\d{2}\.\d{4})'),
+    re.compile(r'/\s*Wert:\s*(\d{2}\.\d{2}\.\d{4})'),
+]
+_WKN_RE = re.compile(r'WKN\s+([A-Z0-9]{6})')
+_ISIN_RE = re.compile(r'([A-Z]{2}[A-Z0-9]{10})')
+_STMT_NUM_RE = re.compile(r'(\d{4})_result\.json')
+_INPUT_FILE_RE = re.compile(r'Konto_Auszug_2022_000[3-7]_result\.json$')
+
+
+_DOT, _COMMA, _SPACE, _PLUS = b'., +'  # Byte-Werte für _parse_de_fast
+
+
+def _parse_de_fast(s: str) -> Decimal:
+    """Ein einziger Durchlauf: Zeichen kopieren, Trennzeichen-Positionen merken,
+    danach nur noch die Trennzeichen im Puffer korrigieren"""
+    buf = bytearray()
+    dots = []
+    commas = []
+    for b in s.encode():
+        if b == _DOT:
+            dots.append(len(buf))
+        elif b == _COMMA:
+            commas.append(len(buf))
+        elif b == _SPACE or b == _PLUS:
+            continue
+        buf.append(b)
     
     # Erkenne Format automatisch:
     # Deutsches Format: 450.105,96 (Punkt für Tausender, Komma für Dezimal)
     # Englisches Format: 450105.96 (Punkt für Dezimal)
     # String-Zahlen wie "405107.75" könnten beides sein!
-    
-    # Zähle Punkte und Kommas
-    num_dots = amount_str.count('.')
-    num_commas = amount_str.count(',')
-    
-    # Entscheide basierend auf Pattern
-    if num_commas == 1 and num_dots <= 1:
-        # Deutsches Format: 450.105,96 oder 450105,96
-        if num_dots == 1:
-            # Prüfe Position: Punkt sollte vor Komma sein
-            dot_pos = amount_str.index('.')
-            comma_pos = amount_str.index(',')
-            if dot_pos < comma_pos:
-                # Deutsches Format mit Tausendertrennzeichen
-                amount_str = amount_str.replace('.', '').replace(',', '.')
-            else:
-                # Ungewöhnlich, behandle als englisch
-                amount_str = amount_str.replace(',', '')
-        else:
-            # Nur Komma, definitiv deutsch
-            amount_str = amount_str.replace(',', '.')
-    elif num_dots == 1 and num_commas == 0:
-        # Könnte englisch ODER deutsch ohne Dezimalstellen sein
-        # Prüfe ob es wie eine große Zahl aussieht
-        parts = amount_str.split('.')
-        if len(parts) == 2 and len(parts[1]) == 2:
-            # Wahrscheinlich englisches Format (z.B. 405107.75)
-            pass  # Nichts tun, ist schon richtig
-        elif len(parts) == 2 and len(parts[1]) == 3:
-            # Wahrscheinlich deutsches Format (z.B. 405.107)
-            amount_str = amount_str.replace('.', '')
+    n_dots = len(dots)
+    drop = ()
+    if len(commas) == 1 and n_dots <= 1:
+        if n_dots == 1 and commas[0] < dots[0]:
+            drop = commas             # Ungewöhnlich, behandle als englisch
         else:
-            # Unsicher, lasse wie es ist
-            pass
-    elif num_dots > 1:
-        # Mehrere Punkte = deutsches Format mit Tausendertrennzeichen
-        amount_str = amount_str.replace('.', '').replace(',', '.')
-    
+            buf[commas[0]] = _DOT     # Deutsch: Komma ist Dezimaltrenner
+            drop = dots
+    elif n_dots == 1 and not commas:
+        # Genau 3 Stellen nach dem Punkt: deutsche Tausender (z.B. 405.107)
+        if len(buf) - dots[0] - 1 == 3:
+            drop = dots
+    elif n_dots > 1:
+        # Mehrere Punkte = deutsche Tausendertrennzeichen
+        for i in commas:
+            buf[i] = _DOT
+        drop = dots
+    
+    for i in reversed(drop):
+        del buf[i]
+    return Decimal(buf.decode())
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_de_cached(s: str) -> Decimal:
+    """Parst einen Betrags-String; gleiche Strings (Salden, Gebühren) nur einmal"""
+    amount_str = s.replace('EUR', '').strip()
     try:
-        return Decimal(amount_str)
-    except:
+        return _parse_de_fast(amount_str)
+    except InvalidOperation:
         logger.warning(f"Konnte Betrag nicht parsen: {amount_str}")
         return Decimal('0')
 
 
+def parse_german_amount(amount_str: str) -> Decimal:
+    """Konvertiert deutschen Betrag zu Decimal - erkennt automatisch das Format"""
+    if isinstance(amount_str, (int, float)):
+        return Decimal(str(amount_str))
+    if isinstance(amount_str, str):
+        return _parse_de_cached(amount_str)
+    return _parse_de_cached.__wrapped__(str(amount_str))
+
+
 def extract_valuta_date(description: str) -> Optional[str]:
     """Extrahiert Valuta-Datum aus Beschreibung"""
-    patterns = [
-        r'Wert:\s*(\d{2}\.\d{2}\.\d{4})',
-        r'Valuta:\s*(\d{2}\.\d{2}\.\d{4})',
-        r'/\s*Wert:\s*(\d{2}\.\d{2}\.\d{4})'
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, description)
+    for pattern in _VALUTA_PATTERNS:
+        match = pattern.search(description)
         if match:
             return match.group(1)
     return None
@@ -133,12 +165,12 @@ def extract_wkn_isin(description: str) -> Tuple[Optional[str], Optional[str], Op
     name = None
     
     # WKN
-    wkn_match = re.search(r'WKN\s+([A-Z0-9]{6})', description)
+    wkn_match = _WKN_RE.search(description)
     if wkn_match:
         wkn = wkn_match.group(1)
     
     # ISIN
-    isin_match = re.search(r'([A-Z]{2}[A-Z0-9]{10})', description)
+    isin_match = _ISIN_RE.search(description)
     if isin_match:
         isin = isin_match.group(1)
     
@@ -149,23 +181,30 @@ def extract_wkn_isin(description: str) -> Tuple[Optional[str], Optional[str], Op
     return wkn, isin, name
 
 
-def ask_llm_v7_analysis(json_file: str, 
-                        ollama_url: str = "https://fs.aiora.rest",
-                        model: str = "qwen3:8b") -> Dict[str, Any]:
-    """
-    Version 7: Korrigierte LLM-Summierung mit expliziten Anweisungen
-    """
-    logger.info(f"Analysiere V7 (korrigierte Summierung): {json_file}")
+def _truncate_text(text: Optional[str], limit: int) -> str:
+    """Kürzt nur wenn nötig (kein Kopieren kurzer Texte) und entfernt Rand-Leerraum"""
+    text = text or ""
+    if len(text) > limit:
+        text = text[:limit]
+    return text.strip()
+
+
+def _load_doc_text(json_file: str, limit: int = 20000) -> str:
+    """Liest nur das Feld "text" (gekürzt), ohne das ganze JSON zu materialisieren"""
+    if ijson is not None:
+        try:
+            with open(json_file, 'rb') as f:
+                return _truncate_text(next(ijson.items(f, 'text'), None), limit)
+        except ijson.JSONError as e:
+            logger.warning(f"ijson konnte {json_file} nicht lesen ({e}), verwende json")
     
-    # JSON laden
     with open(json_file, 'r', encoding='utf-8') as f:
         content = json.load(f)
-    
-    # Text für Analyse
-    doc_text = content.get("text", "")[:20000]
-    
-    # Strukturierter Prompt für V7 mit verbesserter Summierung
-    question = """SCHRITT-FÜR-SCHRITT ANLEITUNG FÜR DEUTSCHE KONTOAUSZÜGE:
+    return _truncate_text(content.get("text"), limit)
+
+
+# Strukturierter Prompt für V7 mit verbesserter Summierung
+V7_QUESTION = """SCHRITT-FÜR-SCHRITT ANLEITUNG FÜR DEUTSCHE KONTOAUSZÜGE:
 
 🔴 KRITISCH - DEUTSCHES ZAHLENFORMAT:
 - "450.105,96" = 450105.96 (vierhundertfünfzigtausend)
@@ -255,78 +294,283 @@ WICHTIGE FELDER IN DER VALIDIERUNG:
 
 Extrahiere in strukturiertem JSON-Format.
 """
+
+V7_SYSTEM_PROMPT = 'Du bist ein präziser Dokumentenanalyse-Assistent für deutsche Kontoauszüge. Du MUSST beim Summieren ALLE Transaktionen addieren, nicht nur einzelne!'
+
+# Anleitung steht in der System-Nachricht: identischer Prompt-Anfang bei jeder
+# Anfrage, damit Ollama den KV-Cache des Präfixes wiederverwenden kann
+V7_SYSTEM_MESSAGE = f"{V7_SYSTEM_PROMPT}\n\nAufgabe:\n{V7_QUESTION}"
+KEEP_ALIVE = '30m'   # Modell zwischen den Anfragen geladen halten
+NUM_CTX = 16384      # Mindestkontext: Anleitung + Dokument (20000 Zeichen) + Antwort
+MAX_NUM_CTX = 32768  # Obergrenze pro Anfrage; größere Batches werden aufgeteilt
+CHARS_PER_TOKEN = 3  # Grobe Schätzung für deutschen Text (eher zu viele Tokens)
+
+# Feste Sampling-Optionen aller V7 Anfragen (num_ctx/num_predict kommen pro Anfrage dazu)
+V7_OPTIONS = {'temperature': 0.1, 'stop': ['\n\n\n']}
+
+# Zwischengespeicherte LLM-Antworten (pro Dokumentinhalt, Modell, Anleitung und Optionen)
+CACHE_DIR = Path('.cache')
+
+# Ändert sich Anleitung oder Optionen, passen alte Antworten nicht mehr
+_PROMPT_FINGERPRINT = hashlib.sha256(
+    json.dumps([V7_SYSTEM_MESSAGE, V7_OPTIONS, NUM_CTX, MAX_NUM_CTX], ensure_ascii=False).encode('utf-8')
+).hexdigest()[:8]
+
+
+def _cache_path(doc_text: str, model: str) -> Path:
+    """Cache-Datei für Dokumentinhalt + Modell + Anleitung/Optionen"""
+    key = hashlib.sha256(doc_text.encode('utf-8')).hexdigest()[:16]
+    return CACHE_DIR / f"v7_{key}_{_PROMPT_FINGERPRINT}_{re.sub(r'[^A-Za-z0-9._-]', '_', model)}.json"
+
+
+def _load_cached_answer(cache_file: Path) -> Optional[Dict[str, Any]]:
+    """Gespeicherte LLM-Antwort oder None (fehlend/beschädigt)"""
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Cache-Datei {cache_file} unlesbar, frage LLM erneut: {e}")
+        return None
+
+
+def _store_cached_answer(cache_file: Path, result: Dict[str, Any]) -> None:
+    """Schreibt die LLM-Antwort atomar (temporäre Datei + os.replace)"""
+    CACHE_DIR.mkdir(exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=CACHE_DIR, prefix=cache_file.name, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False)
+        os.replace(tmp_name, cache_file)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def _num_predict(doc_text: str) -> int:
+    """Token-Budget nach Dokumentgröße (grob: Zeilen ~ Transaktionen), max. 4000"""
+    return min(4000, 400 + 80 * doc_text.count('\n'))
+
+
+def _estimate_tokens(text: str) -> int:
+    """Geschätzte Tokenzahl eines Textes"""
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+_SYSTEM_TOKENS = _estimate_tokens(V7_SYSTEM_MESSAGE) + 256  # inkl. Chat-Template und Batch-Anweisung
+
+
+def _num_ctx(prompt_tokens: int, num_predict: int) -> int:
+    """Kontextgröße für Prompt + Antwort, auf 2048 aufgerundet (Ollama kürzt sonst stillschweigend den Prompt)"""
+    needed = prompt_tokens + num_predict
+    return min(MAX_NUM_CTX, max(NUM_CTX, -(-needed // 2048) * 2048))
+
+
+def _batch_groups(doc_texts: List[str]) -> List[List[int]]:
+    """Teilt die Dokumente so auf, dass jede Batch-Anfrage in MAX_NUM_CTX passt"""
+    groups: List[List[int]] = []
+    current: List[int] = []
+    used = _SYSTEM_TOKENS
+    for i, text in enumerate(doc_texts):
+        cost = _estimate_tokens(text) + _num_predict(text)
+        if current and used + cost > MAX_NUM_CTX:
+            groups.append(current)
+            current, used = [], _SYSTEM_TOKENS
+        current.append(i)
+        used += cost
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def _chat_streamed(client: ollama.AsyncClient, label: str, **kwargs) -> str:
+    """Streamt die LLM-Antwort und setzt den Inhalt zusammen (Fortschritt im Debug-Log)"""
+    teile = []
+    async for chunk in await client.chat(stream=True, **kwargs):
+        teile.append(chunk['message']['content'])
+        if len(teile) % 200 == 0:
+            logger.debug(f"{label}: {len(teile)} Chunks empfangen")
+    logger.debug(f"{label}: Antwort vollständig ({len(teile)} Chunks)")
+    return ''.join(teile)
+
+
+async def ask_llm_v7_analysis(json_file: str, 
+                              client: ollama.AsyncClient,
+                              model: str = "qwen3:8b",
+                              use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Version 7: Korrigierte LLM-Summierung mit expliziten Anweisungen
     
-    logger.info("Sende V7 Anfrage mit korrigierter Summierungslogik...")
+    Bei unverändertem Dokument wird die LLM-Antwort aus .cache/ gelesen.
+    """
+    logger.info(f"Analysiere V7 (korrigierte Summierung): {json_file}")
+    
+    # Text für Analyse (nur das Feld "text" wird gelesen) - im Thread-Pool,
+    # damit Datei-I/O die parallel laufenden Anfragen nicht blockiert
+    doc_text = await asyncio.to_thread(_load_doc_text, json_file)
     
-    # Client mit custom URL
-    client = ollama.Client(host=ollama_url)
+    cache_file = _cache_path(doc_text, model)
+    cached = _load_cached_answer(cache_file) if use_cache else None
+    if cached is not None:
+        logger.info(f"Verwende gespeicherte LLM-Antwort: {cache_file}")
+        return _build_analyse(json_file, cached, model)
     
-    # Anfrage an LLM
-    response = client.chat(
+    logger.info("Sende V7 Anfrage mit korrigierter Summierungslogik...")
+    
+    # Anfrage an LLM (gemeinsamer Client, Verbindung bleibt offen)
+    content = await _chat_streamed(
+        client, Path(json_file).name,
         model=model,
         messages=[
             {
                 'role': 'system',
-                'content': 'Du bist ein präziser Dokumentenanalyse-Assistent für deutsche Kontoauszüge. Du MUSST beim Summieren ALLE Transaktionen addieren, nicht nur einzelne!'
+                'content': V7_SYSTEM_MESSAGE
             },
             {
                 'role': 'user', 
-                'content': f"Dokument:\n{doc_text}\n\nAufgabe:\n{question}"
+                'content': ''.join(("Dokument:\n", doc_text))
             }
         ],
         format='json',
+        keep_alive=KEEP_ALIVE,
         options={
-            'temperature': 0.1,
-            'num_predict': 4000
+            **V7_OPTIONS,
+            'num_ctx': _num_ctx(_SYSTEM_TOKENS + _estimate_tokens(doc_text), _num_predict(doc_text)),
+            'num_predict': _num_predict(doc_text)
         }
     )
     
     # Parse Antwort
     try:
-        result = json.loads(response['message']['content'])
+        result = json.loads(content)
         # Debug: zeige was LLM zurückgibt
         logger.debug(f"LLM Response keys: {list(result.keys())[:5]}")
         logger.debug(f"Anfangssaldo type: {type(result.get('anfangssaldo'))}")
     except Exception as e:
         logger.error(f"JSON Parse Error: {e}")
-        logger.error(f"Raw response: {response['message']['content'][:500]}")
+        logger.error(f"Raw response: {content[:500]}")
         result = {}
     
+    if use_cache and result:
+        _store_cached_answer(cache_file, result)
+    
+    return _build_analyse(json_file, result, model)
+
+
+async def ask_llm_v7_batch(json_files: List[str],
+                           client: ollama.AsyncClient,
+                           model: str = "qwen3:8b") -> List[Dict[str, Any]]:
+    """
+    Version 7 (Batch): Mehrere Auszüge pro Anfrage - die Anleitung wird nur
+    einmal je Anfrage mitgeschickt und vom Modell verarbeitet. Passen nicht alle
+    Auszüge in MAX_NUM_CTX, wird auf mehrere (parallele) Anfragen aufgeteilt.
+    """
+    doc_texts = await asyncio.gather(*(asyncio.to_thread(_load_doc_text, f) for f in json_files))
+    groups = _batch_groups(doc_texts)
+    logger.info(f"Analysiere V7 (Batch): {len(json_files)} Auszüge in {len(groups)} Anfrage(n)")
+    
+    antworten = await asyncio.gather(*(
+        _ask_batch_group(client, model, [doc_texts[i] for i in group]) for group in groups
+    ))
+    
+    results: List[Dict[str, Any]] = [{}] * len(json_files)
+    for group, group_results in zip(groups, antworten):
+        for i, result in zip(group, group_results):
+            results[i] = result
+    return [_build_analyse(f, result, model) for f, result in zip(json_files, results)]
+
+
+async def _ask_batch_group(client: ollama.AsyncClient, model: str,
+                           doc_texts: List[str]) -> List[Dict[str, Any]]:
+    """Eine Batch-Anfrage; liefert pro Dokument die rohe LLM-Antwort ({} wenn fehlend)"""
+    dokumente = "\n\n".join(
+        f"=== AUSZUG {i} ===\n{text}" for i, text in enumerate(doc_texts, 1)
+    )
+    user_msg = (
+        f"Analysiere die folgenden {len(doc_texts)} Kontoauszüge und gib ein JSON-Objekt "
+        f"{{\"results\": [...]}} zurück, mit einem Objekt pro Auszug in derselben Reihenfolge. "
+        f"Wende die Aufgabe auf JEDEN Auszug einzeln an.\n\n{dokumente}"
+    )
+    num_predict = sum(_num_predict(text) for text in doc_texts)
+    
+    content = await _chat_streamed(
+        client, "Batch",
+        model=model,
+        messages=[
+            {'role': 'system', 'content': V7_SYSTEM_MESSAGE},
+            {'role': 'user', 'content': user_msg}
+        ],
+        format='json',
+        keep_alive=KEEP_ALIVE,
+        options={
+            **V7_OPTIONS,
+            'num_ctx': _num_ctx(_SYSTEM_TOKENS + _estimate_tokens(dokumente), num_predict),
+            'num_predict': num_predict
+        }
+    )
+    
+    # Antwort wieder auf die einzelnen Dokumente aufteilen
+    try:
+        data = json.loads(content)
+    except json.JSONDecodeError as e:
+        logger.error(f"JSON Parse Error: {e}")
+        logger.error(f"Raw response: {content[:500]}")
+        data = {}
+    results = data.get("results", []) if isinstance(data, dict) else data
+    if not isinstance(results, list):
+        results = []
+    if len(results) != len(doc_texts):
+        logger.warning(f"Batch-Antwort enthält {len(results)} statt {len(doc_texts)} Auszüge")
+    
+    return [
+        results[i] if i < len(results) and isinstance(results[i], dict) else {}
+        for i in range(len(doc_texts))
+    ]
+
+
+# 1,234,567.89 -> 1.234.567,89 (ohne locale, Komma und Punkt tauschen)
+_DE_NUMBER = str.maketrans(',.', '.,')
+
+
+def _normalize_saldo(raw: Any, extras: Dict[str, Any]) -> Any:
+    """Saldo als Zahl -> Dict mit deutschem Betragstext; Dicts bleiben unverändert"""
+    if not isinstance(raw, (int, float)):
+        return raw
+    return {
+        "betrag": raw,
+        "betrag_text": f"{raw:,.2f}".translate(_DE_NUMBER) + " EUR",
+        **extras
+    }
+
+
+def _build_analyse(json_file: str, result: Dict[str, Any], model: str) -> Dict[str, Any]:
+    """Validiert die LLM-Antwort (von model) und bringt sie in das einheitliche V7 Format"""
     # Extrahiere Statement-Nummer aus Dateiname
-    match = re.search(r'(\d{4})_result\.json', json_file)
+    match = _STMT_NUM_RE.search(json_file)
     stmt_num = match.group(1) if match else "unbekannt"
     
-    # Python-Validierung
+    # Python-Validierung (geparste Salden für check_continuity aufheben)
     python_validation = validate_with_python(result)
+    saldo_dec = {k: python_validation.pop(k) for k in ("_anfangssaldo_dec", "_endsaldo_dec")
+                 if k in python_validation}
     
     # Konvertiere LLM-Antwort in einheitliches Format
     # Handle verschiedene Antwortformate vom LLM
-    anfangssaldo_raw = result.get("anfangssaldo", {})
-    if isinstance(anfangssaldo_raw, (int, float)):
-        anfangssaldo_dict = {
-            "betrag": anfangssaldo_raw,
-            "betrag_text": f"{anfangssaldo_raw:,.2f} EUR".replace(",", "X").replace(".", ",").replace("X", "."),
-            "datum": result.get("anfangssaldo_datum", ""),
-            "auszug_nr_referenz": result.get("anfangssaldo_referenz", ""),
-            "beschreibung": result.get("anfangssaldo_beschreibung", "")
-        }
-    else:
-        anfangssaldo_dict = anfangssaldo_raw
-        
-    endsaldo_raw = result.get("endsaldo", {})
-    if isinstance(endsaldo_raw, (int, float)):
-        endsaldo_dict = {
-            "betrag": endsaldo_raw,
-            "betrag_text": f"{endsaldo_raw:,.2f} EUR".replace(",", "X").replace(".", ",").replace("X", "."),
-            "datum": result.get("endsaldo_datum", ""),
-            "uhrzeit": result.get("endsaldo_uhrzeit", ""),
-            "beschreibung": result.get("endsaldo_beschreibung", "")
-        }
-    else:
-        endsaldo_dict = endsaldo_raw
+    anfangssaldo_dict = _normalize_saldo(result.get("anfangssaldo", {}), {
+        "datum": result.get("anfangssaldo_datum", ""),
+        "auszug_nr_referenz": result.get("anfangssaldo_referenz", ""),
+        "beschreibung": result.get("anfangssaldo_beschreibung", "")
+    })
+    endsaldo_dict = _normalize_saldo(result.get("endsaldo", {}), {
+        "datum": result.get("endsaldo_datum", ""),
+        "uhrzeit": result.get("endsaldo_uhrzeit", ""),
+        "beschreibung": result.get("endsaldo_beschreibung", "")
+    })
     
     return {
         "datei": json_file,
+        "model": model,
         "schritt1_auszugsnummer": result.get("schritt1_auszugsnummer", result.get("auszugsnummer", "")),
         "auszug_nummer": result.get("auszug_nummer", result.get("auszugsnummer", "")),
         "kontodaten": result.get("kontodaten", {}),
@@ -339,10 +583,25 @@ Extrahiere in strukturiertem JSON-Format.
         "anzahl_transaktionen": len(result.get("transaktionen", [])),
         "transaktionen_summe": result.get("transaktionen_summe", 0),
         "schritt5_validierung": result.get("schritt5_validierung", result.get("validierung", {})),
-        "python_validierung": python_validation
+        "python_validierung": python_validation,
+        **saldo_dec
     }
 
 
+# 16 Stellen reichen für Cent-Beträge bis 10^14 EUR (Standard wären 28)
+_CENTS_CONTEXT = Context(prec=16)
+
+
+def _cents(betrag: Decimal) -> int:
+    """Decimal-Betrag in ganze Cent"""
+    return int((betrag * 100).to_integral_value())
+
+
+def _to_cents(amount: Any) -> int:
+    """Betrag (deutsch/englisch/Zahl) direkt in ganze Cent"""
+    return _cents(parse_german_amount(amount))
+
+
 def validate_with_python(llm_result: Dict) -> Dict[str, Any]:
     """Python-basierte Validierung der LLM-Ergebnisse"""
     try:
@@ -361,24 +620,26 @@ def validate_with_python(llm_result: Dict) -> Dict[str, Any]:
             
         transaktionen = llm_result.get("transaktionen", [])
         
-        # Berechne Summe aller Transaktionen
-        summe = Decimal('0')
-        for t in transaktionen:
-            betrag = parse_german_amount(t.get("betrag", 0))
-            summe += betrag
+        # Summe aller Transaktionen in ganzen Cent (int-Addition statt Decimal)
+        with localcontext(_CENTS_CONTEXT):
+            summe_cents = sum(_to_cents(t.get("betrag", 0)) for t in transaktionen)
+            anfang_cents = _cents(anfangssaldo)
+            end_cents = _cents(endsaldo)
         
         # Berechne erwarteten Endsaldo
-        berechneter_saldo = anfangssaldo + summe
-        differenz = abs(berechneter_saldo - endsaldo)
+        berechnet_cents = anfang_cents + summe_cents
+        differenz_cents = abs(berechnet_cents - end_cents)
         
         return {
             "anfangssaldo": float(anfangssaldo),
             "endsaldo_aus_dokument": float(endsaldo),
-            "transaktionen_summe": float(summe),
-            "berechneter_endsaldo": float(berechneter_saldo),
-            "differenz": float(differenz),
-            "validierung_ok": differenz < Decimal('0.01'),
-            "formel": f"{float(anfangssaldo):.2f} + {float(summe):.2f} = {float(berechneter_saldo):.2f}"
+            "transaktionen_summe": summe_cents / 100,
+            "berechneter_endsaldo": berechnet_cents / 100,
+            "differenz": differenz_cents / 100,
+            "validierung_ok": differenz_cents < 1,
+            "formel": f"{anfang_cents / 100:.2f} + {summe_cents / 100:.2f} = {berechnet_cents / 100:.2f}",
+            "_anfangssaldo_dec": anfangssaldo,
+            "_endsaldo_dec": endsaldo
         }
     except Exception as e:
         logger.error(f"Fehler bei Python-Validierung: {e}")
@@ -388,30 +649,35 @@ def validate_with_python(llm_result: Dict) -> Dict[str, Any]:
         }
 
 
+def _saldo_decimal(analyse: Dict, key: str) -> Decimal:
+    """Saldo als Decimal - bereits bei der Validierung geparst, sonst hier parsen"""
+    cached = analyse.get(f"_{key}_dec")
+    if cached is not None:
+        return cached
+    
+    # Handle verschiedene Datentypen für den Saldo
+    data = analyse.get(key, {})
+    if isinstance(data, (int, float, str)):
+        return parse_german_amount(data)
+    return parse_german_amount(data.get("betrag", 0))
+
+
+def _public_fields(analyse: Dict) -> Dict:
+    """Entfernt interne Felder (Präfix "_") vor dem Speichern"""
+    return {k: v for k, v in analyse.items() if not k.startswith("_")}
+
+
 def check_continuity(analysen: List[Dict]) -> Dict[str, Any]:
     """Prüft Kontinuität zwischen aufeinanderfolgenden Auszügen"""
     kontinuitaet_checks = []
     
-    for i in range(len(analysen) - 1):
-        current = analysen[i]
-        next_stmt = analysen[i + 1]
+    for current, next_stmt in zip(analysen, analysen[1:]):
+        current_end = _saldo_decimal(current, "endsaldo")
+        next_start = _saldo_decimal(next_stmt, "anfangssaldo")
         
-        # Handle verschiedene Datentypen für endsaldo
-        current_end_data = current.get("endsaldo", {})
-        if isinstance(current_end_data, (int, float, str)):
-            current_end = parse_german_amount(current_end_data)
-        else:
-            current_end = parse_german_amount(current_end_data.get("betrag", 0))
-            
-        # Handle verschiedene Datentypen für anfangssaldo
-        next_start_data = next_stmt.get("anfangssaldo", {})
-        if isinstance(next_start_data, (int, float, str)):
-            next_start = parse_german_amount(next_start_data)
-        else:
-            next_start = parse_german_amount(next_start_data.get("betrag", 0))
-        
-        diff = abs(current_end - next_start)
-        kontinuitaet_ok = diff < Decimal('0.01')
+        with localcontext(_CENTS_CONTEXT):
+            diff_cents = abs(_cents(current_end) - _cents(next_start))
+        kontinuitaet_ok = diff_cents < 1
         
         kontinuitaet_checks.append({
             "auszug_von": current.get("auszug_nummer", "?"),
@@ -419,7 +685,7 @@ def check_continuity(analysen: List[Dict]) -> Dict[str, Any]:
             "endsaldo_von": float(current_end),
             "anfangssaldo_nach": float(next_start),
             "kontinuität_ok": kontinuitaet_ok,
-            "differenz": float(diff)
+            "differenz": diff_cents / 100
         })
     
     return {
@@ -428,25 +694,101 @@ def check_continuity(analysen: List[Dict]) -> Dict[str, Any]:
     }
 
 
-def main():
-    """Hauptfunktion für V7 Analyse"""
+def _escalation_indices(ergebnisse: List[Any]) -> List[int]:
+    """Auszüge mit fehlgeschlagener Salden- oder Kontinuitätsprüfung"""
+    fehlerhaft = set()
+    for i, analyse in enumerate(ergebnisse):
+        if isinstance(analyse, Exception) or not analyse['python_validierung'].get('validierung_ok'):
+            fehlerhaft.add(i)
     
-    parser = argparse.ArgumentParser(description='Kontoauszug Analyse V7 - Korrigierte Summierung')
-    parser.add_argument('--model', default='qwen3:8b', help='Ollama Model (default: qwen3:8b)')
-    parser.add_argument('--url', default='https://fs.aiora.rest', help='Ollama URL')
-    args = parser.parse_args()
+    for i, (current, next_stmt) in enumerate(zip(ergebnisse, ergebnisse[1:])):
+        if isinstance(current, Exception) or isinstance(next_stmt, Exception):
+            continue
+        with localcontext(_CENTS_CONTEXT):
+            diff_cents = abs(_cents(_saldo_decimal(current, "endsaldo"))
+                             - _cents(_saldo_decimal(next_stmt, "anfangssaldo")))
+        if diff_cents >= 1:
+            fehlerhaft.update((i, i + 1))
     
-    print("\nTeste Ollama Verbindung...")
-    client = ollama.Client(host=args.url)
+    return sorted(fehlerhaft)
+
+
+def _dumps_json(obj: Any) -> bytes:
+    """Serialisiert ein Objekt als eingerücktes UTF-8 JSON (Decimal als String)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False, default=str).encode('utf-8')
+
+
+async def _gather(tasks) -> List[Any]:
+    """Führt alle Analysen parallel aus, Exceptions werden als Ergebnis zurückgegeben"""
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _run_analysen(args, json_files: List[str]) -> Tuple[List[Any], List[int]]:
+    """Verbindungstest, schneller Durchlauf und Eskalation mit EINEM AsyncClient"""
+    # Verbindungen begrenzt auf die Anzahl parallel arbeitender Ollama-Slots
+    parallel = int(os.environ.get('OLLAMA_NUM_PARALLEL', '5'))
+    client = ollama.AsyncClient(host=args.url, limits=httpx.Limits(max_connections=parallel))
     
+    print("\nTeste Ollama Verbindung...")
     try:
-        # Teste Verbindung
-        models = client.list()
+        await client.list()
         print("✓ Ollama verfügbar")
     except Exception as e:
         print(f"✗ Ollama nicht erreichbar: {e}")
         sys.exit(1)
     
+    if args.batch:
+        # Eine einzige Anfrage für alle Auszüge
+        print(f"Sende {len(json_files)} Auszüge in einer Batch-Anfrage ({args.model_fast})...")
+        try:
+            ergebnisse = await ask_llm_v7_batch(json_files, client, args.model_fast)
+        except Exception as e:
+            ergebnisse = [e] * len(json_files)
+    else:
+        # LLM Analysen parallel ausführen
+        print(f"Sende {len(json_files)} Anfragen parallel ({args.model_fast})...")
+        ergebnisse = await _gather(ask_llm_v7_analysis(f, client, args.model_fast, not args.no_cache)
+                                   for f in json_files)
+    
+    # Nur fehlgeschlagene Auszüge mit dem genauen Modell wiederholen
+    eskaliert = _escalation_indices(ergebnisse) if args.model_accurate != args.model_fast else []
+    if eskaliert:
+        print(f"Wiederhole {len(eskaliert)} Auszüge mit {args.model_accurate}...")
+        tasks = [ask_llm_v7_analysis(json_files[i], client, args.model_accurate, not args.no_cache)
+                 for i in eskaliert]
+        for i, analyse in zip(eskaliert, await _gather(tasks)):
+            if not isinstance(analyse, Exception):
+                ergebnisse[i] = analyse
+    
+    return ergebnisse, eskaliert
+
+
+def main():
+    """Hauptfunktion für V7 Analyse
+    
+    Alle Auszüge werden gleichzeitig an Ollama geschickt. Damit der Server sie
+    auch parallel bearbeitet, muss er mit OLLAMA_NUM_PARALLEL=5 (oder mehr)
+    gestartet sein, sonst werden die Anfragen dort nacheinander abgearbeitet.
+    """
+    
+    parser = argparse.ArgumentParser(description='Kontoauszug Analyse V7 - Korrigierte Summierung')
+    parser.add_argument('--model-fast', default='qwen3:8b-q4_K_M',
+                        help='Schnelles (quantisiertes) Modell für den ersten Durchlauf (default: qwen3:8b-q4_K_M)')
+    parser.add_argument('--model-accurate', default='qwen3:8b',
+                        help='Genaues Modell für Auszüge mit fehlgeschlagener Prüfung (default: qwen3:8b)')
+    parser.add_argument('--model',
+                        help='Alle Auszüge mit diesem Modell analysieren (setzt --model-fast und --model-accurate)')
+    parser.add_argument('--url', default='https://fs.aiora.rest', help='Ollama URL')
+    parser.add_argument('--batch', action='store_true',
+                        help='Alle Auszüge in einer einzigen LLM-Anfrage analysieren')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Gespeicherte LLM-Antworten in .cache/ ignorieren')
+    args = parser.parse_args()
+    if args.model:
+        args.model_fast = args.model_accurate = args.model
+    
     print("\n" + "="*80)
     print("KONTOAUSZUG ANALYSE V7 - KORRIGIERTE SUMMIERUNG")
     print("="*80)
@@ -457,7 +799,7 @@ def main():
     print("✓ Korrekte Berechnung von plus_transaktionen")
     
     # Finde alle JSON-Dateien
-    json_files = sorted(Path('.').glob('Konto_Auszug_2022_000[3-7]_result.json'))
+    json_files = sorted(e.name for e in os.scandir('.') if e.is_file() and _INPUT_FILE_RE.match(e.name))
     
     if not json_files:
         print("\n✗ Keine Kontoauszug JSON-Dateien gefunden!")
@@ -465,19 +807,21 @@ def main():
     
     print(f"\nGefunden: {len(json_files)} Kontoauszüge für V7 Analyse")
     
+    ergebnisse, eskaliert = asyncio.run(_run_analysen(args, json_files))
+    
     # Sammle alle Analysen
     alle_analysen = []
     erfolgreiche_pruefungen = 0
     
-    # Verarbeite jede Datei
-    for idx, json_file in enumerate(json_files, 1):
+    # Ergebnisse in Dateireihenfolge ausgeben
+    for idx, (json_file, analyse) in enumerate(zip(json_files, ergebnisse), 1):
         print(f"\n{'='*70}")
-        print(f"[{idx}/{len(json_files)}] Verarbeite: {json_file.name}")
+        print(f"[{idx}/{len(json_files)}] Verarbeite: {json_file}")
         print(f"{'='*70}")
         
         try:
-            # LLM Analyse
-            analyse = ask_llm_v7_analysis(str(json_file), args.url, args.model)
+            if isinstance(analyse, Exception):
+                raise analyse
             alle_analysen.append(analyse)
             
             # Zeige Ergebnisse
@@ -534,13 +878,13 @@ def main():
             logger.error(f"Fehler bei Verarbeitung von {json_file}: {e}")
             print(f"\n❌ Fehler: {e}")
     
-    # Kontinuitätsprüfung
-    if len(alle_analysen) > 1:
+    # Kontinuitätsprüfung (einmal berechnet, für Ausgabe und Ergebnis)
+    kontinuitaet = check_continuity(alle_analysen) if len(alle_analysen) > 1 else None
+    if kontinuitaet:
         print(f"\n{'='*70}")
         print("KONTINUITÄTSPRÜFUNG ZWISCHEN AUSZÜGEN")
         print(f"{'='*70}")
         
-        kontinuitaet = check_continuity(alle_analysen)
         for check in kontinuitaet['kontinuität_prüfungen']:
             if check['kontinuität_ok']:
                 print(f"✅ Auszug {check['auszug_von']} → {check['auszug_nach']}: "
@@ -553,7 +897,9 @@ def main():
     ergebnis = {
         "version": "7.0",
         "beschreibung": "Korrigierte LLM-Summierung mit expliziten Anweisungen",
-        "model": args.model,
+        "model_fast": args.model_fast,
+        "model_accurate": args.model_accurate,
+        "eskaliert": [json_files[i] for i in eskaliert],
         "verbesserungen": [
             "Explizite Summierungsanweisungen für LLM",
             "Detaillierte Beispiele mit Mehrfach-Transaktionen",
@@ -561,15 +907,15 @@ def main():
             "Vergleich LLM vs Python Summierung",
             "Verbesserte Fehlerdiagnose"
         ],
-        "analysen": alle_analysen,
+        "analysen": [_public_fields(a) for a in alle_analysen],
         "anzahl_dokumente": len(alle_analysen),
         "erfolgreiche_pruefungen": erfolgreiche_pruefungen,
-        "kontinuitaet": check_continuity(alle_analysen) if len(alle_analysen) > 1 else None
+        "kontinuitaet": kontinuitaet
     }
     
     output_file = "kontoauszuege_analyse_komplett_v7.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(ergebnis, f, ensure_ascii=False, indent=2)
+    with open(output_file, 'wb') as f:
+        f.write(_dumps_json(ergebnis))
     
     # Zusammenfassung
     print(f"\n{'='*80}")
@@ -577,7 +923,7 @@ def main():
     print(f"📊 Gespeichert in: {output_file}")
     print(f"✅ Erfolgreiche Saldenprüfungen: {erfolgreiche_pruefungen}/{len(alle_analysen)}")
     
-    if ergebnis.get('kontinuitaet', {}).get('alle_ok'):
+    if kontinuitaet and kontinuitaet.get('alle_ok'):
         print(f"✅ Kontinuität zwischen allen Auszügen bestätigt")
     
     print(f"{'='*80}")
@@ -9,83 +9,135 @@ Version 8: Duale Zahlenrepräsentation (String + Numerisch) für sichere Konvert
 import json
 import sys
 import re
+import asyncio
+import functools
 from pathlib import Path
+import numpy as np
 import ollama
-from typing import Dict, Any, List, Optional, Tuple
+from typing import Dict, Any, FrozenSet, List, Optional, Tuple
 import logging
-from decimal import Decimal
+from decimal import Context, ROUND_HALF_EVEN
 import argparse
 
+# Optional: ijson zum Streamen der (teils sehr großen) Docling-Ergebnisse
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+# Optional: orjson für schnelleres Lesen/Schreiben von JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: numba für den Batch-Parser der Dokumentbeträge
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
-def parse_german_amount(amount_str: str) -> Decimal:
-    """Konvertiert deutschen Betrag zu Decimal - erkennt automatisch das Format"""
-    if isinstance(amount_str, (int, float)):
-        return Decimal(str(amount_str))
-        
-    amount_str = str(amount_str).replace('EUR', '').strip().replace('+', '').replace(' ', '')
-    
-    # Erkenne Format automatisch:
-    # Deutsches Format: 450.105,96 (Punkt für Tausender, Komma für Dezimal)
-    # Englisches Format: 450105.96 (Punkt für Dezimal)
+# Zustände für _parse_amount_fsm
+_START, _SIGN, _INT, _SEP = range(4)
+_DIGITS = frozenset(b'0123456789')
+_SEPARATORS = frozenset(b'.,')
+_MINUS = b'-'[0]
+_COMMA = b','[0]
+
+# Vorzeichen '+' und Leerraum in einem translate()-Durchlauf entfernen
+_CLEAN_TABLE = str.maketrans({'+': None, ' ': None, '\t': None, '\n': None, '\r': None, '\xa0': None})
+# Feste Decimal-Umgebung: 18 Stellen reichen für EUR-Beträge (Standard wäre 28)
+_CTX = Context(prec=18, rounding=ROUND_HALF_EVEN)
+
+# Deutsche Beträge im Dokumenttext: 450.105,96 / -1,95 / 405107,75
+_AMOUNT_RE = re.compile(r'(?<![\d.,])-?(?:\d{1,3}(?:\.\d{3})+|\d+),\d{2}(?![\d,])')
+_AMOUNT_RE_BYTES = re.compile(_AMOUNT_RE.pattern.encode('ascii'))
+
+
+def _parse_amount_fsm(s: str) -> Optional[Tuple[int, int]]:
+    """
+    Einmaliger Durchlauf über die Bytes eines Betrags.
     
-    # Zähle Punkte und Kommas
-    num_dots = amount_str.count('.')
-    num_commas = amount_str.count(',')
-    
-    # Entscheide basierend auf Pattern
-    if num_commas == 1 and num_dots <= 1:
-        # Deutsches Format: 450.105,96 oder 450105,96
-        if num_dots == 1:
-            # Prüfe Position: Punkt sollte vor Komma sein
-            dot_pos = amount_str.index('.')
-            comma_pos = amount_str.index(',')
-            if dot_pos < comma_pos:
-                # Deutsches Format mit Tausendertrennzeichen
-                amount_str = amount_str.replace('.', '').replace(',', '.')
-            else:
-                # Ungewöhnlich, behandle als englisch
-                amount_str = amount_str.replace(',', '')
-        else:
-            # Nur Komma, definitiv deutsch
-            amount_str = amount_str.replace(',', '.')
-    elif num_dots == 1 and num_commas == 0:
-        # Könnte englisch ODER deutsch ohne Dezimalstellen sein
-        parts = amount_str.split('.')
-        if len(parts) == 2 and len(parts[1]) == 2:
-            # Wahrscheinlich englisches Format (z.B. 405107.75)
-            pass  # Nichts tun, ist schon richtig
-        elif len(parts) == 2 and len(parts[1]) == 3:
-            # Wahrscheinlich deutsches Format (z.B. 405.107)
-            amount_str = amount_str.replace('.', '')
+    Das letzte Trennzeichen ist Dezimaltrenner, wenn es ein Komma ist oder ein
+    Punkt, dem nicht genau 3 Ziffern folgen (405.107 = Tausender). Alle anderen
+    Trennzeichen sind Tausendertrenner und werden übersprungen.
+    Gibt (Ziffernwert mit Vorzeichen, Nachkommastellen) zurück, z.B.
+    "-1.234,56" -> (-123456, 2), oder None, wenn der String keine Zahl ist.
+    """
+    state = _START
+    negative = False
+    value = 0
+    last_sep = 0           # Byte des letzten Trennzeichens (0 = keins)
+    digits_since_sep = 0
+    
+    for b in s.encode():
+        if b in _DIGITS:
+            value = value * 10 + (b - 48)
+            digits_since_sep += 1
+            state = _INT
+        elif b in _SEPARATORS:
+            last_sep = b
+            digits_since_sep = 0
+            state = _SEP
+        elif b == _MINUS and state == _START:
+            negative = True
+            state = _SIGN
         else:
-            # Unsicher, lasse wie es ist
-            pass
-    elif num_dots > 1:
-        # Mehrere Punkte = deutsches Format mit Tausendertrennzeichen
-        amount_str = amount_str.replace('.', '').replace(',', '.')
+            return None
     
-    try:
-        return Decimal(amount_str)
-    except:
-        logger.warning(f"Konnte Betrag nicht parsen: {amount_str}")
-        return Decimal('0')
+    if state == _START or state == _SIGN:
+        return None
+    frac = digits_since_sep if last_sep == _COMMA or (last_sep and digits_since_sep != 3) else 0
+    return (-value if negative else value), frac
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_cached(amount_str: str) -> Optional[Tuple[int, int]]:
+    """Parst einen Betrags-String; wiederkehrende Beträge nur einmal"""
+    if 'E' in amount_str:
+        amount_str = amount_str.replace('EUR', '')
+    amount_str = amount_str.translate(_CLEAN_TABLE)
+    
+    # Deutsches Format: 450.105,96 (Punkt für Tausender, Komma für Dezimal)
+    # Englisches Format: 450105.96 (Punkt für Dezimal)
+    result = _parse_amount_fsm(amount_str)
+    if result is None:
+        if logger.isEnabledFor(logging.WARNING):
+            logger.warning("Konnte Betrag nicht parsen: %s", amount_str)
+    return result
+
+
+def parse_amount_cents(amount: Any) -> int:
+    """Betrag in ganzen Cent - Strings ohne Umweg über Decimal"""
+    if isinstance(amount, (int, float)):
+        return int(_CTX.create_decimal(str(amount)).scaleb(2, _CTX).to_integral_value(context=_CTX))
+    parsed = _parse_cached(str(amount))
+    if parsed is None:
+        return 0
+    value, frac = parsed
+    if frac <= 2:
+        return value * 10 ** (2 - frac)
+    # Mehr als 2 Nachkommastellen (selten): kaufmännisch über Decimal runden
+    return int(_CTX.create_decimal(value).scaleb(2 - frac, _CTX).to_integral_value(context=_CTX))
 
 
 def validate_number_conversion(original: str, converted: float) -> Dict[str, Any]:
-    """Validiert die Konvertierung von String zu Zahl"""
+    """Validiert die Konvertierung von String zu Zahl (Vergleich in ganzen Cent)"""
     try:
-        python_converted = float(parse_german_amount(original))
-        match = abs(python_converted - converted) < 0.01
+        python_cents = parse_amount_cents(original)
+        llm_cents = round(converted * 100)
+        match = python_cents == llm_cents
         
         return {
             "original_string": original,
             "llm_converted": converted,
-            "python_converted": python_converted,
+            "python_converted": python_cents / 100,
             "conversion_match": match,
-            "difference": abs(python_converted - converted) if not match else 0
+            "difference": abs(python_cents - llm_cents) / 100 if not match else 0
         }
     except Exception as e:
         return {
@@ -97,23 +149,79 @@ def validate_number_conversion(original: str, converted: float) -> Dict[str, Any
         }
 
 
-def ask_llm_v8_analysis(json_file: str, 
-                        ollama_url: str = "https://fs.aiora.rest",
-                        model: str = "qwen3:8b") -> Dict[str, Any]:
-    """
-    Version 8: Duale Zahlenrepräsentation für sichere Konvertierung
-    """
-    logger.info(f"Analysiere V8 (duale Zahlenrepräsentation): {json_file}")
-    
-    # JSON laden
-    with open(json_file, 'r', encoding='utf-8') as f:
-        content = json.load(f)
-    
-    # Text für Analyse
-    doc_text = content.get("text", "")[:20000]
-    
-    # Strukturierter Prompt für V8 mit dualer Zahlenrepräsentation
-    question = """KONTOAUSZUG ANALYSE MIT DUALER ZAHLENREPRÄSENTATION:
+def _loads_json(data: Any) -> Any:
+    """Parst JSON (str oder bytes) - orjson wenn verfügbar"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps_json(obj: Any) -> bytes:
+    """Serialisiert ein Objekt als eingerücktes UTF-8 JSON (Decimal als String)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False, default=str).encode('utf-8')
+
+
+def _cents_kernel(buf, offsets, ends, out):
+    """Beträge aus _AMOUNT_RE-Treffern in Cent: alle Ziffern aneinander (genau 2 Nachkommastellen)"""
+    for k in range(len(offsets)):
+        value = 0
+        negativ = False
+        for i in range(offsets[k], ends[k]):
+            # int(): mit uint8 würde value * 10 ohne numba (NumPy 2) überlaufen
+            b = int(buf[i])
+            if b == 45:  # '-'
+                negativ = True
+            elif 48 <= b <= 57:
+                value = value * 10 + (b - 48)
+        out[k] = -value if negativ else value
+
+
+@functools.lru_cache(maxsize=1)
+def _compiled_cents_kernel():
+    """JIT-Kompilierung erst beim ersten Aufruf, damit Import und --help schnell bleiben"""
+    if njit is None:
+        return _cents_kernel
+    return njit(cache=True)(_cents_kernel)
+
+
+def parse_many_to_cents(offsets: np.ndarray, ends: np.ndarray, flat_buf: np.ndarray) -> np.ndarray:
+    """Parst alle Treffer [offsets[k], ends[k]) aus einem uint8-Puffer in einem Aufruf zu Cent"""
+    out = np.empty(len(offsets), dtype=np.int64)
+    _compiled_cents_kernel()(flat_buf, offsets, ends, out)
+    return out
+
+
+def scan_amounts(doc_text: str) -> FrozenSet[int]:
+    """Alle Beträge im Dokument in Cent (ohne Vorzeichen) - deterministisch, ohne LLM"""
+    if njit is None:
+        return frozenset(abs(parse_amount_cents(m)) for m in _AMOUNT_RE.findall(doc_text))
+    
+    data = doc_text.encode('utf-8')
+    spans = [m.span() for m in _AMOUNT_RE_BYTES.finditer(data)]
+    offsets = np.fromiter((a for a, _ in spans), dtype=np.int64, count=len(spans))
+    ends = np.fromiter((e for _, e in spans), dtype=np.int64, count=len(spans))
+    cents = parse_many_to_cents(offsets, ends, np.frombuffer(data, dtype=np.uint8))
+    return frozenset(np.abs(cents).tolist())
+
+
+def _load_doc_text(json_file: str, limit: int = 20000) -> str:
+    """Liest nur das Feld "text" (gekürzt), ohne das ganze JSON zu materialisieren"""
+    if ijson is not None:
+        try:
+            with open(json_file, 'rb') as f:
+                return (next(ijson.items(f, 'text'), None) or "")[:limit]
+        except ijson.JSONError as e:
+            logger.warning(f"ijson konnte {json_file} nicht lesen ({e}), verwende json")
+    
+    with open(json_file, 'rb') as f:
+        content = _loads_json(f.read())
+    return content.get("text", "")[:limit]
+
+
+# Strukturierter Prompt für V8 mit dualer Zahlenrepräsentation (einmal pro Modul statt pro Aufruf)
+_V8_QUESTION = """KONTOAUSZUG ANALYSE MIT DUALER ZAHLENREPRÄSENTATION:
 
 🔴 WICHTIG: DUALE ZAHLENFORMAT-ANGABE
 Für JEDEN Geldbetrag musst du ZWEI Werte angeben:
@@ -203,71 +311,148 @@ validierung = {
 - Zahlen korrekt konvertieren (Punkt→nichts, Komma→Punkt)
 
 Gib die Analyse als strukturiertes JSON zurück."""
+
+_V8_SYSTEM = 'Du bist ein präziser Dokumentenanalyse-Assistent. Du musst JEDEN Betrag ZWEIMAL angeben: einmal als Original-String (betrag_original) und einmal als konvertierte Zahl (betrag_nummer).'
+
+KEEP_ALIVE = '30m'  # Modell zwischen den Anfragen im GPU-Speicher halten
+
+
+async def warmup_model(client: ollama.AsyncClient, model: str) -> None:
+    """Lädt das Modell vorab (1 Token), damit die Analysen nicht auf den Ladevorgang warten
+    
+    Nur eine Optimierung: Fehler werden protokolliert, die Analysen melden sie pro Datei.
+    """
+    try:
+        await client.chat(
+            model=model,
+            messages=[{'role': 'user', 'content': 'ping'}],
+            keep_alive=KEEP_ALIVE,
+            options={'num_predict': 1}
+        )
+    except Exception as e:
+        logger.warning(f"Vorladen von {model} fehlgeschlagen: {e}")
+
+
+async def ask_llm_v8(json_file: str, 
+                     ollama_url: str = "https://fs.aiora.rest",
+                     model: str = "qwen3:8b",
+                     client: Optional[ollama.AsyncClient] = None) -> Dict[str, Any]:
+    """
+    Version 8: Duale Zahlenrepräsentation - nur die LLM-Anfrage (rohes Ergebnis)
+    
+    `client` wird für alle Anfragen geteilt (Verbindung bleibt offen).
+    """
+    logger.info(f"Analysiere V8 (duale Zahlenrepräsentation): {json_file}")
+    
+    # Text für Analyse (nur das Feld "text" wird gelesen)
+    doc_text = _load_doc_text(json_file)
     
     logger.info("Sende V8 Anfrage mit dualer Zahlenrepräsentation...")
     
-    # Client mit custom URL
-    client = ollama.Client(host=ollama_url)
+    if client is None:
+        client = ollama.AsyncClient(host=ollama_url)
     
-    # Anfrage an LLM
-    response = client.chat(
+    # Anfrage an LLM (gestreamt)
+    stream = await client.chat(
+        stream=True,
         model=model,
         messages=[
             {
                 'role': 'system',
-                'content': 'Du bist ein präziser Dokumentenanalyse-Assistent. Du musst JEDEN Betrag ZWEIMAL angeben: einmal als Original-String (betrag_original) und einmal als konvertierte Zahl (betrag_nummer).'
+                'content': _V8_SYSTEM
             },
             {
                 'role': 'user', 
-                'content': f"Dokument:\n{doc_text}\n\nAufgabe:\n{question}"
+                'content': f"Dokument:\n{doc_text}\n\nAufgabe:\n{_V8_QUESTION}"
             }
         ],
         format='json',
+        keep_alive=KEEP_ALIVE,
         options={
             'temperature': 0.1,
             'num_predict': 4000
         }
     )
     
+    teile = []
+    begonnen = False
+    async for chunk in stream:
+        teil = chunk['message']['content']
+        teile.append(teil)
+        # Früher Abbruch: Antwort beginnt nicht mit einem JSON-Objekt
+        if not begonnen and teil.strip():
+            begonnen = True
+            if not teil.lstrip().startswith('{'):
+                logger.error(f"Antwort ist kein JSON-Objekt, breche ab: {teil[:100]}")
+                await stream.aclose()
+                break
+        if len(teile) % 200 == 0:
+            logger.debug("%s: %d Chunks empfangen", json_file, len(teile))
+    content = ''.join(teile)
+    
     # Parse Antwort
     try:
-        result = json.loads(response['message']['content'])
-        logger.debug(f"LLM Response keys: {list(result.keys())[:10]}")
+        result = _loads_json(content)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("LLM Response keys: %s", list(result.keys())[:10])
     except Exception as e:
         logger.error(f"JSON Parse Error: {e}")
-        logger.error(f"Raw response: {response['message']['content'][:500]}")
+        logger.error(f"Raw response: {content[:500]}")
         result = {}
     
-    # Validiere Konvertierungen
-    conversion_validations = []
-    
-    # Prüfe Anfangssaldo
-    if isinstance(result.get("anfangssaldo"), dict):
-        anfang_orig = result["anfangssaldo"].get("betrag_original", "")
-        anfang_num = result["anfangssaldo"].get("betrag_nummer", 0)
-        if anfang_orig:
-            val = validate_number_conversion(anfang_orig, anfang_num)
-            val["field"] = "anfangssaldo"
-            conversion_validations.append(val)
-    
-    # Prüfe Endsaldo
-    if isinstance(result.get("endsaldo"), dict):
-        ende_orig = result["endsaldo"].get("betrag_original", "")
-        ende_num = result["endsaldo"].get("betrag_nummer", 0)
-        if ende_orig:
-            val = validate_number_conversion(ende_orig, ende_num)
-            val["field"] = "endsaldo"
-            conversion_validations.append(val)
-    
-    # Prüfe Transaktionen
-    for i, trans in enumerate(result.get("transaktionen", [])):
-        if isinstance(trans, dict):
-            trans_orig = trans.get("betrag_original", "")
-            trans_num = trans.get("betrag_nummer", 0)
-            if trans_orig:
-                val = validate_number_conversion(trans_orig, trans_num)
-                val["field"] = f"transaktion_{i+1}"
-                conversion_validations.append(val)
+    # Beträge aus dem Dokument für den Abgleich mit der LLM-Antwort
+    if isinstance(result, dict):
+        result["_dokument_betraege"] = scan_amounts(doc_text)
+    return result
+
+
+async def ask_llm_v8_analysis(json_file: str, 
+                              ollama_url: str = "https://fs.aiora.rest",
+                              model: str = "qwen3:8b") -> Dict[str, Any]:
+    """
+    Version 8: Duale Zahlenrepräsentation für sichere Konvertierung
+    """
+    return analyse_v8_result(json_file, await ask_llm_v8(json_file, ollama_url, model))
+
+
+def _check_conversion(data: Any, field: str) -> Optional[Dict[str, Any]]:
+    """
+    Konvertierungsprüfung für einen Betrag (None ohne betrag_original)
+    
+    Setzt zusätzlich "betrag_cent" (Python-Konvertierung des Originals) am Betrag selbst.
+    """
+    match data:
+        case {"betrag_original": orig, "betrag_nummer": num} if orig:
+            pass
+        case {"betrag_original": orig} if orig:
+            num = 0
+        case _:
+            return None
+    val = validate_number_conversion(orig, num)
+    val["field"] = field
+    if val["python_converted"] is not None:
+        data["betrag_cent"] = parse_amount_cents(orig)
+    return val
+
+
+def analyse_v8_result(json_file: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Prüft die Zahlenkonvertierungen der LLM-Antwort und validiert die Salden"""
+    anfangssaldo = result.get("anfangssaldo", {})
+    endsaldo = result.get("endsaldo", {})
+    transaktionen = result.get("transaktionen", []) or []
+    
+    # Validiere Konvertierungen (Anfangssaldo, Endsaldo, Transaktionen)
+    checks = [_check_conversion(anfangssaldo, "anfangssaldo"),
+              _check_conversion(endsaldo, "endsaldo")]
+    checks.extend(_check_conversion(trans, f"transaktion_{i+1}")
+                  for i, trans in enumerate(transaktionen))
+    conversion_validations = [val for val in checks if val is not None]
+    
+    # Stehen die vom LLM genannten Beträge überhaupt im Dokument?
+    doc_amounts = result.pop("_dokument_betraege", None)
+    if doc_amounts is not None:
+        for val in conversion_validations:
+            val["im_dokument"] = abs(parse_amount_cents(val["original_string"])) in doc_amounts
     
     # Python-Validierung mit korrigierten Werten
     python_validation = validate_with_python_v8(result, conversion_validations)
@@ -276,80 +461,77 @@ Gib die Analyse als strukturiertes JSON zurück."""
     return {
         "datei": json_file,
         "auszug_nummer": result.get("auszug_nummer", ""),
-        "anfangssaldo": result.get("anfangssaldo", {}),
-        "endsaldo": result.get("endsaldo", {}),
-        "transaktionen": result.get("transaktionen", []),
-        "anzahl_transaktionen": len(result.get("transaktionen", [])),
+        "anfangssaldo": anfangssaldo,
+        "endsaldo": endsaldo,
+        "transaktionen": transaktionen,
+        "anzahl_transaktionen": len(transaktionen),
         "validierung": result.get("validierung", {}),
         "conversion_validations": conversion_validations,
         "python_validierung": python_validation
     }
 
 
+def _pick_amount(t: Any) -> int:
+    """Betrag einer Transaktion in Cent - Python-Konvertierung des Originals bevorzugt"""
+    match t:
+        case {"betrag_cent": cents}:
+            return cents
+        case {"betrag_nummer": int() | float() as num}:
+            return round(num * 100)
+        case {"betrag_original": orig}:
+            return parse_amount_cents(orig)
+        case _:
+            return 0
+
+
+def _saldo_cents(data: Any) -> int:
+    """Saldo in Cent - Python-Konvertierung des Originals bevorzugt"""
+    match data:
+        case {"betrag_cent": cents}:
+            return cents
+        case {"betrag_nummer": num}:
+            return parse_amount_cents(num)
+        case {"betrag_original": orig}:
+            return parse_amount_cents(orig)
+        case dict():
+            return 0
+        case _:
+            return parse_amount_cents(data)
+
+
 def validate_with_python_v8(llm_result: Dict, conversions: List[Dict]) -> Dict[str, Any]:
-    """Python-basierte Validierung mit Konvertierungs-Korrekturen"""
+    """Python-basierte Validierung mit Konvertierungs-Korrekturen (in ganzen Cent)"""
     try:
-        # Verwende Python-konvertierte Werte wenn LLM-Konvertierung falsch ist
-        anfangssaldo = None
-        endsaldo = None
+        # Verwende Python-konvertierte Werte (betrag_cent) wenn vorhanden
+        anfang_cents = _saldo_cents(llm_result.get("anfangssaldo", {}))
+        end_cents = _saldo_cents(llm_result.get("endsaldo", {}))
         
-        # Anfangssaldo
-        anfang_data = llm_result.get("anfangssaldo", {})
-        if isinstance(anfang_data, dict):
-            # Finde Konvertierungs-Validierung
-            anfang_conv = next((c for c in conversions if c["field"] == "anfangssaldo"), None)
-            if anfang_conv and anfang_conv.get("python_converted") is not None:
-                anfangssaldo = Decimal(str(anfang_conv["python_converted"]))
-            else:
-                anfangssaldo = parse_german_amount(anfang_data.get("betrag_nummer", anfang_data.get("betrag_original", 0)))
-        else:
-            anfangssaldo = parse_german_amount(anfang_data)
-            
-        # Endsaldo
-        ende_data = llm_result.get("endsaldo", {})
-        if isinstance(ende_data, dict):
-            # Finde Konvertierungs-Validierung
-            ende_conv = next((c for c in conversions if c["field"] == "endsaldo"), None)
-            if ende_conv and ende_conv.get("python_converted") is not None:
-                endsaldo = Decimal(str(ende_conv["python_converted"]))
-            else:
-                endsaldo = parse_german_amount(ende_data.get("betrag_nummer", ende_data.get("betrag_original", 0)))
-        else:
-            endsaldo = parse_german_amount(ende_data)
-        
-        # Transaktionen summieren mit korrigierten Werten
-        summe = Decimal('0')
-        for i, t in enumerate(llm_result.get("transaktionen", [])):
-            # Finde Konvertierungs-Validierung für diese Transaktion
-            trans_conv = next((c for c in conversions if c["field"] == f"transaktion_{i+1}"), None)
-            if trans_conv and trans_conv.get("python_converted") is not None:
-                betrag = Decimal(str(trans_conv["python_converted"]))
-            elif isinstance(t, dict):
-                betrag = parse_german_amount(t.get("betrag_nummer", t.get("betrag_original", 0)))
-            else:
-                betrag = parse_german_amount(t.get("betrag", 0))
-            summe += betrag
+        # Transaktionen summieren mit korrigierten Werten (int64, exakt)
+        trans = llm_result.get("transaktionen", [])
+        betraege = np.fromiter((_pick_amount(t) for t in trans),
+                               dtype=np.int64, count=len(trans))
+        summe_cents = int(betraege.sum())
         
         # Berechne erwarteten Endsaldo
-        berechneter_saldo = anfangssaldo + summe
-        differenz = abs(berechneter_saldo - endsaldo)
+        berechnet_cents = anfang_cents + summe_cents
+        differenz_cents = abs(berechnet_cents - end_cents)
         
         # Zähle Konvertierungsfehler
         conversion_errors = sum(1 for c in conversions if not c.get("conversion_match", False))
         
         return {
-            "anfangssaldo": float(anfangssaldo),
-            "endsaldo_aus_dokument": float(endsaldo),
-            "transaktionen_summe": float(summe),
-            "berechneter_endsaldo": float(berechneter_saldo),
-            "differenz": float(differenz),
-            "validierung_ok": differenz < Decimal('0.01'),
-            "formel": f"{float(anfangssaldo):.2f} + {float(summe):.2f} = {float(berechneter_saldo):.2f}",
+            "anfangssaldo": anfang_cents / 100,
+            "endsaldo_aus_dokument": end_cents / 100,
+            "transaktionen_summe": summe_cents / 100,
+            "berechneter_endsaldo": berechnet_cents / 100,
+            "differenz": differenz_cents / 100,
+            "validierung_ok": differenz_cents < 1,
+            "formel": f"{anfang_cents / 100:.2f} + {summe_cents / 100:.2f} = {berechnet_cents / 100:.2f}",
             "conversion_errors": conversion_errors,
             "total_conversions": len(conversions)
         }
     except Exception as e:
-        logger.error(f"Fehler bei Python-Validierung: {e}")
+        logger.error("Fehler bei Python-Validierung: %s", e)
         return {
             "error": str(e),
             "validierung_ok": False
@@ -368,8 +550,9 @@ def check_continuity_v8(analysen: List[Dict]) -> Dict[str, Any]:
         current_end = current["python_validierung"]["endsaldo_aus_dokument"]
         next_start = next_stmt["python_validierung"]["anfangssaldo"]
         
-        diff = abs(current_end - next_start)
-        kontinuitaet_ok = diff < 0.01
+        # Vergleich in ganzen Cent (keine Float-Toleranz nötig)
+        diff_cents = abs(round(current_end * 100) - round(next_start * 100))
+        kontinuitaet_ok = diff_cents == 0
         
         kontinuitaet_checks.append({
             "auszug_von": current.get("auszug_nummer", "?"),
@@ -377,7 +560,7 @@ def check_continuity_v8(analysen: List[Dict]) -> Dict[str, Any]:
             "endsaldo_von": current_end,
             "anfangssaldo_nach": next_start,
             "kontinuität_ok": kontinuitaet_ok,
-            "differenz": diff
+            "differenz": diff_cents / 100
         })
     
     return {
@@ -386,25 +569,39 @@ def check_continuity_v8(analysen: List[Dict]) -> Dict[str, Any]:
     }
 
 
-def main():
-    """Hauptfunktion für V8 Analyse"""
-    
-    parser = argparse.ArgumentParser(description='Kontoauszug Analyse V8 - Duale Zahlenrepräsentation')
-    parser.add_argument('--model', default='qwen3:8b', help='Ollama Model (default: qwen3:8b)')
-    parser.add_argument('--url', default='https://fs.aiora.rest', help='Ollama URL')
-    args = parser.parse_args()
+async def _gather(tasks) -> List[Any]:
+    """Führt alle LLM-Anfragen parallel aus, Exceptions werden als Ergebnis zurückgegeben"""
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def _run_llm(args, json_files: List[Path]) -> List[Any]:
+    """Verbindungstest, Aufwärmen und alle Anfragen über EINEN AsyncClient"""
+    client = ollama.AsyncClient(host=args.url)
     
     print("\nTeste Ollama Verbindung...")
-    client = ollama.Client(host=args.url)
-    
     try:
-        # Teste Verbindung
-        models = client.list()
+        await client.list()
         print("✓ Ollama verfügbar")
     except Exception as e:
         print(f"✗ Ollama nicht erreichbar: {e}")
         sys.exit(1)
     
+    print(f"Lade Modell {args.model}...")
+    await warmup_model(client, args.model)
+    
+    # LLM-Anfragen für alle Auszüge parallel, Auswertung danach
+    print(f"Sende {len(json_files)} Anfragen parallel...")
+    return await _gather(ask_llm_v8(str(f), args.url, args.model, client) for f in json_files)
+
+
+def main():
+    """Hauptfunktion für V8 Analyse"""
+    
+    parser = argparse.ArgumentParser(description='Kontoauszug Analyse V8 - Duale Zahlenrepräsentation')
+    parser.add_argument('--model', default='qwen3:8b', help='Ollama Model (default: qwen3:8b)')
+    parser.add_argument('--url', default='https://fs.aiora.rest', help='Ollama URL')
+    args = parser.parse_args()
+    
     print("\n" + "="*80)
     print("KONTOAUSZUG ANALYSE V8 - DUALE ZAHLENREPRÄSENTATION")
     print("="*80)
@@ -423,20 +620,25 @@ def main():
     
     print(f"\nGefunden: {len(json_files)} Kontoauszüge für V8 Analyse")
     
+    llm_results = asyncio.run(_run_llm(args, json_files))
+    
     # Sammle alle Analysen
     alle_analysen = []
     erfolgreiche_pruefungen = 0
     gesamt_konvertierungsfehler = 0
     
     # Verarbeite jede Datei
-    for idx, json_file in enumerate(json_files, 1):
+    for idx, (json_file, llm_result) in enumerate(zip(json_files, llm_results), 1):
         print(f"\n{'='*70}")
         print(f"[{idx}/{len(json_files)}] Verarbeite: {json_file.name}")
         print(f"{'='*70}")
         
         try:
-            # LLM Analyse
-            analyse = ask_llm_v8_analysis(str(json_file), args.url, args.model)
+            if isinstance(llm_result, Exception):
+                raise llm_result
+            
+            # Konvertierungs- und Saldenprüfung
+            analyse = analyse_v8_result(str(json_file), llm_result)
             alle_analysen.append(analyse)
             
             # Zeige Ergebnisse
@@ -491,19 +693,24 @@ def main():
                 print(f"   Fehler: {pv['conversion_errors']}")
                 print(f"   Erfolgsrate: {((pv['total_conversions'] - pv['conversion_errors']) / pv['total_conversions'] * 100):.1f}%")
             
+            # Beträge, die so nicht im Dokument vorkommen
+            fremd = [c['field'] for c in conv_vals if c.get('im_dokument') is False]
+            if fremd:
+                print(f"\n⚠️  NICHT IM DOKUMENT GEFUNDEN: {', '.join(fremd)}")
+            
             logger.info("✓ V8 Analyse abgeschlossen")
             
         except Exception as e:
             logger.error(f"Fehler bei Verarbeitung von {json_file}: {e}")
             print(f"\n❌ Fehler: {e}")
     
-    # Kontinuitätsprüfung
-    if len(alle_analysen) > 1:
+    # Kontinuitätsprüfung (einmal berechnet, für Ausgabe und Ergebnis)
+    kontinuitaet = check_continuity_v8(alle_analysen) if len(alle_analysen) > 1 else None
+    if kontinuitaet:
         print(f"\n{'='*70}")
         print("KONTINUITÄTSPRÜFUNG ZWISCHEN AUSZÜGEN")
         print(f"{'='*70}")
         
-        kontinuitaet = check_continuity_v8(alle_analysen)
         for check in kontinuitaet['kontinuität_prüfungen']:
             if check['kontinuität_ok']:
                 print(f"✅ Auszug {check['auszug_von']} → {check['auszug_nach']}: "
@@ -528,12 +735,12 @@ def main():
         "anzahl_dokumente": len(alle_analysen),
         "erfolgreiche_pruefungen": erfolgreiche_pruefungen,
         "gesamt_konvertierungsfehler": gesamt_konvertierungsfehler,
-        "kontinuitaet": check_continuity_v8(alle_analysen) if len(alle_analysen) > 1 else None
+        "kontinuitaet": kontinuitaet
     }
     
     output_file = "kontoauszuege_analyse_komplett_v8.json"
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(ergebnis, f, ensure_ascii=False, indent=2)
+    with open(output_file, 'wb') as f:
+        f.write(_dumps_json(ergebnis))
     
     # Zusammenfassung
     print(f"\n{'='*80}")
@@ -542,7 +749,7 @@ def main():
     print(f"✅ Erfolgreiche Saldenprüfungen: {erfolgreiche_pruefungen}/{len(alle_analysen)}")
     print(f"⚠️  Gesamt Konvertierungsfehler: {gesamt_konvertierungsfehler}")
     
-    if ergebnis.get('kontinuitaet', {}).get('alle_ok'):
+    if kontinuitaet and kontinuitaet.get('alle_ok'):
         print(f"✅ Kontinuität zwischen allen Auszügen bestätigt")
     
     print(f"{'='*80}")
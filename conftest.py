@@ -0,0 +1,38 @@
+"""
+pytest-Fixtures für test_docling.py
+
+Parallel ausführen mit: pytest -n auto --dist=loadscope test_docling.py
+"""
+
+import pytest
+
+from test_docling import create_test_files, get_processor
+
+
+@pytest.fixture(scope="session")
+def processor_vlm():
+    """Processor mit SmolDocling VLM (einmal pro Worker geladen)"""
+    return get_processor(use_vlm=True)
+
+
+@pytest.fixture(scope="session")
+def processor_fast():
+    """Processor ohne VLM (schneller)"""
+    return get_processor(use_vlm=False)
+
+
+@pytest.fixture(scope="session")
+def test_files(tmp_path_factory):
+    """Markdown- und HTML-Testdatei in einem temporären Verzeichnis"""
+    return create_test_files(tmp_path_factory.mktemp("docling_test"))
+
+
+@pytest.fixture(scope="session")
+def md_file(test_files):
+    return test_files[0]
+
+
+@pytest.fixture(scope="session")
+def html_file(test_files):
+    return test_files[1]
+
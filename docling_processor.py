@@ -5,11 +5,20 @@ Verarbeitet verschiedene Dokumentformate und ermöglicht Q&A via LLM
 """
 
 import argparse
+import functools
+import hashlib
+import itertools
 import json
 import logging
+import os
+import re
+import stat
 import sys
+import tempfile
+import weakref
+from collections import OrderedDict
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterator, Tuple
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -28,15 +37,51 @@ except ImportError as e:
     print("Bitte installieren Sie Docling mit: pip install docling")
     sys.exit(1)
 
+# Optional: Hardware-Beschleunigung (neuere Docling-Versionen)
+try:
+    from docling.datamodel.accelerator_options import AcceleratorOptions, AcceleratorDevice
+except ImportError:
+    try:
+        from docling.datamodel.pipeline_options import AcceleratorOptions, AcceleratorDevice
+    except ImportError:
+        AcceleratorOptions = AcceleratorDevice = None
+
+# Optional: Threaded PDF Pipeline (überlappt Seiten-I/O, Layout, OCR und TableFormer)
+try:
+    from docling.document_converter import PdfFormatOption
+    from docling.datamodel.pipeline_options import ThreadedPdfPipelineOptions
+    from docling.pipeline.threaded_standard_pdf_pipeline import ThreadedStandardPdfPipeline
+    _THREADED_IMPORT_ERROR = None
+except ImportError as e:
+    # Ältere Docling-Version: Warnung beim Anlegen des Converters
+    ThreadedStandardPdfPipeline = None
+    _THREADED_IMPORT_ERROR = e
+
 # Ollama import
 try:
     import ollama
+    import httpx
 except ImportError:
     print("Warnung: Ollama Python Client nicht installiert.")
     print("LLM Q&A Funktionalität wird deaktiviert.")
     print("Installation mit: pip install ollama")
     ollama = None
 
+# Text-Erkennung für PDFs (braucht pdfplumber), um OCR bei Text-PDFs zu sparen
+from pdf_utils import PDFPLUMBER_AVAILABLE, pdf_has_embedded_text
+
+# Optional: orjson für schnelleres Lesen/Schreiben von JSON
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Optional: tiktoken zum Kürzen des Dokumenttexts auf ein Token-Budget
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
 # Optional: EasyOCR import
 try:
     import easyocr
@@ -45,6 +90,24 @@ except ImportError:
     EASYOCR_AVAILABLE = False
     print("Info: EasyOCR nicht verfügbar. SmolDocling VLM wird für OCR verwendet.")
 
+try:
+    from importlib.metadata import version as _pkg_version
+    DOCLING_VERSION = _pkg_version('docling')
+except Exception:
+    DOCLING_VERSION = 'unbekannt'
+
+# Puffergröße für Ausgabedateien (weniger write()-Syscalls)
+WRITE_BUFFER_SIZE = 1 << 20
+
+# Cache für konvertierte Dokumente (nur mit --cache; Schlüssel: Dateiinhalt,
+# Pipeline-Optionen und Docling-Version). Älteste Einträge werden ab
+# CACHE_MAX_BYTES gelöscht
+CACHE_DIR = Path.home() / '.cache' / 'docling_processor'
+CACHE_MAX_BYTES = 512 << 20
+
+# Grobe Schätzung für das Kürzen ohne tiktoken
+CHARS_PER_TOKEN = 3
+
 # Logging Setup
 logging.basicConfig(
     level=logging.INFO,
@@ -53,9 +116,82 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# Konstante Teile des Q&A Prompts; pro Frage wird nur einmal zusammengefügt
+_PROMPT_PREFIX = (
+    "Du bist ein hilfreicher Assistent, der Fragen zu Dokumenten beantwortet.\n"
+    "            \n"
+    "Hier ist der Inhalt des Dokuments:\n\n"
+)
+_PROMPT_MID = "\n\nBasierend auf diesem Dokument, beantworte bitte folgende Frage:\n"
+_PROMPT_FORMAT = (
+    "\n\nAntworte im JSON Format mit folgender Struktur:\n"
+    "{\n"
+    '    "frage": "'
+)
+_PROMPT_SUFFIX = (
+    '",\n'
+    '    "antwort": "Deine detaillierte Antwort hier",\n'
+    '    "kontext": "Relevanter Textausschnitt aus dem Dokument",\n'
+    '    "konfidenz": "hoch/mittel/niedrig"\n'
+    "}"
+)
+
+# Beginn des "antwort"-Werts und Ende eines JSON-Strings (für max_answer_chars)
+_ANTWORT_START_RE = re.compile(r'"antwort"\s*:\s*"')
+_JSON_STRING_END_RE = re.compile(r'(?:[^"\\]|\\.)*"')
+
+
+def _decode_partial_json_string(raw: str) -> str:
+    """Dekodiert einen abgeschnittenen JSON-String (ohne schließendes Anführungszeichen)"""
+    # Eine angeschnittene Escape-Sequenz (z.B. \u00) am Ende verwerfen
+    for cut in range(min(len(raw), 6) + 1):
+        try:
+            return json.loads('"' + raw[:len(raw) - cut] + '"')
+        except json.JSONDecodeError:
+            continue
+    return raw
+
+
+@functools.lru_cache(maxsize=1)
+def _get_tokenizer():
+    """Lädt den tiktoken-Tokenizer einmalig (None wenn nicht verfügbar)"""
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning("tiktoken Encoding nicht ladbar, kürze nach Zeichen: %s", e)
+        return None
+
+
+def _truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Kürzt Text auf höchstens max_tokens Tokens (ohne tiktoken: geschätzt nach Zeichen)"""
+    enc = _get_tokenizer()
+    if enc is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+    
+    tokens = enc.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return enc.decode(tokens[:max_tokens])
+
+
+class _ConverterEntry:
+    """DocumentConverter mit seinen Pipeline-Optionen (schwach referenzierbar)"""
+    
+    __slots__ = ('converter', 'pipeline_options', '__weakref__')
+    
+    def __init__(self, converter: Any, pipeline_options: Any):
+        self.converter = converter
+        self.pipeline_options = pipeline_options
+
+
 class DoclingProcessor:
     """Hauptklasse für Dokumentverarbeitung mit SmolDocling"""
     
+    # Converter pro Optionssatz, solange noch ein Processor sie verwendet
+    _converters: "weakref.WeakValueDictionary[tuple, _ConverterEntry]" = weakref.WeakValueDictionary()
+    
     SUPPORTED_FORMATS = {
         '.pdf': 'PDF Dokument',
         '.docx': 'Word Dokument',
@@ -71,9 +207,23 @@ class DoclingProcessor:
         '.tiff': 'TIFF Bild',
         '.tif': 'TIFF Bild'
     }
+    _SUPPORTED_SUFFIXES = frozenset(SUPPORTED_FORMATS)
+    
+    # Konstante Teile der Q&A Anfrage (werden pro Frage nur referenziert)
+    _SYSTEM_MSG = {
+        "role": "system",
+        "content": "Du bist ein Experte für Dokumentanalyse. Antworte immer im angeforderten JSON Format."
+    }
+    _OPTS = {
+        "temperature": 0.3,  # Niedrigere Temperatur für faktische Antworten
+        "top_p": 0.9
+    }
     
     def __init__(self, use_vlm: bool = True, use_easyocr: bool = False, 
-                 ollama_url: str = "https://fs.aiora.rest"):
+                 ollama_url: str = "https://fs.aiora.rest",
+                 num_threads: Optional[int] = None, device: str = "auto",
+                 table_mode: str = "fast", force_ocr: bool = False,
+                 use_cache: bool = False, llm_timeout: Optional[float] = 600.0):
         """
         Initialisiert den Processor
         
@@ -81,35 +231,98 @@ class DoclingProcessor:
             use_vlm: SmolDocling VLM verwenden
             use_easyocr: EasyOCR als zusätzliche OCR-Engine
             ollama_url: URL für Ollama API
+            num_threads: Threads für die Modelle (default: Anzahl CPU-Kerne)
+            device: Beschleuniger (auto/cpu/cuda/mps)
+            table_mode: TableFormer Modus (fast/accurate)
+            force_ocr: OCR auch bei PDFs mit eingebettetem Text ausführen
+            use_cache: Konvertierte Dokumente in CACHE_DIR wiederverwenden (opt-in)
+            llm_timeout: Lese-Timeout für LLM Antworten in Sekunden (None: unbegrenzt);
+                Modell-Laden und Prefill langer Prompts brauchen lokal oft Minuten
         """
         self.use_vlm = use_vlm
         self.use_easyocr = use_easyocr and EASYOCR_AVAILABLE
         self.ollama_url = ollama_url
+        self.num_threads = num_threads or os.cpu_count() or 8
+        self.device = device
+        self.table_mode = table_mode
+        self.force_ocr = force_ocr
+        self.use_cache = use_cache
         
-        # Pipeline Options konfigurieren
-        self.pipeline_options = self._configure_pipeline()
+        # Konvertierungsergebnisse dieser Instanz (JSON und Markdown teilen sich einen Lauf)
+        self._convert_cache: "OrderedDict[tuple, Any]" = OrderedDict()
+        self._convert_cache_size = 8
         
-        # Document Converter initialisieren
-        logger.info(f"Initialisiere DocumentConverter (VLM: {use_vlm})")
-        self.converter = DocumentConverter(
-            pipeline_options=self.pipeline_options
-        )
+        # Pipeline Options und Document Converter (bei gleichen Optionen geteilt);
+        # je OCR-Einstellung ein eigener Converter, die Optionen werden nie verändert
+        self._converter_entries: Dict[bool, _ConverterEntry] = {}
+        self._converter_entry = self._get_converter(do_ocr=True)
+        self.pipeline_options = self._converter_entry.pipeline_options
+        self.converter = self._converter_entry.converter
         
         # Ollama Client setup
         if ollama:
-            self.ollama_client = ollama.Client(host=ollama_url)
-            logger.info(f"Ollama Client konfiguriert: {ollama_url}")
+            # Timeout, damit ein hängendes LLM nicht den ganzen Batch blockiert
+            self.ollama_client = ollama.Client(
+                host=ollama_url,
+                timeout=httpx.Timeout(llm_timeout, connect=10.0)
+            )
+            logger.info("Ollama Client konfiguriert: %s", ollama_url)
     
-    def _configure_pipeline(self) -> PipelineOptions:
+    def _get_converter(self, do_ocr: bool) -> _ConverterEntry:
+        """Liefert den Converter für die Optionen dieser Instanz - vorhandene (warme) Pipelines werden wiederverwendet"""
+        entry = self._converter_entries.get(do_ocr)
+        if entry is not None:
+            return entry
+        
+        opts_key = (self.use_vlm, self.use_easyocr, self.table_mode, self.num_threads, self.device, do_ocr)
+        entry = self._converters.get(opts_key)
+        if entry is not None:
+            logger.info("Verwende vorhandenen DocumentConverter (VLM: %s, OCR: %s)", self.use_vlm, do_ocr)
+            self._converter_entries[do_ocr] = entry
+            return entry
+        
+        pipeline_options = self._configure_pipeline(do_ocr)
+        
+        logger.info("Initialisiere DocumentConverter (VLM: %s, OCR: %s)", self.use_vlm, do_ocr)
+        if self.use_vlm and ThreadedStandardPdfPipeline is not None:
+            logger.info("Verwende ThreadedStandardPdfPipeline (%s Threads, Device: %s)", self.num_threads, self.device)
+            converter = DocumentConverter(
+                format_options={
+                    InputFormat.PDF: PdfFormatOption(
+                        pipeline_options=pipeline_options.pdf_options,
+                        pipeline_cls=ThreadedStandardPdfPipeline
+                    )
+                }
+            )
+        else:
+            if self.use_vlm:
+                logger.warning("ThreadedStandardPdfPipeline nicht verfügbar (%s) - verwende Standard-Pipeline",
+                               _THREADED_IMPORT_ERROR)
+            converter = DocumentConverter(
+                pipeline_options=pipeline_options
+            )
+        
+        entry = _ConverterEntry(converter, pipeline_options)
+        self._converters[opts_key] = entry
+        self._converter_entries[do_ocr] = entry
+        return entry
+    
+    def _configure_pipeline(self, do_ocr: bool = True) -> PipelineOptions:
         """Konfiguriert die Processing Pipeline"""
         pipeline_options = PipelineOptions()
         
         # PDF Pipeline mit SmolDocling VLM
         if self.use_vlm:
-            pdf_options = PdfPipelineOptions()
-            pdf_options.do_ocr = True
+            if ThreadedStandardPdfPipeline is not None:
+                pdf_options = ThreadedPdfPipelineOptions()
+            else:
+                pdf_options = PdfPipelineOptions()
+            pdf_options.do_ocr = do_ocr
             pdf_options.do_table_structure = True
-            pdf_options.table_structure_options.mode = TableFormerMode.ACCURATE
+            pdf_options.table_structure_options.mode = (
+                TableFormerMode.ACCURATE if self.table_mode == "accurate" else TableFormerMode.FAST
+            )
+            pdf_options.table_structure_options.do_cell_matching = True
             
             # OCR Engine auswählen
             if self.use_easyocr:
@@ -122,6 +335,13 @@ class DoclingProcessor:
                 # SmolDocling als Standard VLM
                 logger.info("Verwende SmolDocling VLM für OCR und Layout-Erkennung")
             
+            # Modelle mit mehreren Threads / auf GPU rechnen lassen
+            if AcceleratorOptions is not None:
+                pdf_options.accelerator_options = AcceleratorOptions(
+                    num_threads=self.num_threads,
+                    device=AcceleratorDevice(self.device)
+                )
+            
             pipeline_options.pdf_options = pdf_options
         
         # Aktiviere Table Recognition
@@ -129,6 +349,89 @@ class DoclingProcessor:
         
         return pipeline_options
     
+    def _select_converter(self, paths: List[Path]) -> _ConverterEntry:
+        """Wählt den Converter ohne OCR, wenn alle PDFs bereits eingebetteten Text enthalten"""
+        if (getattr(self.pipeline_options, 'pdf_options', None) is None
+                or self.force_ocr or not PDFPLUMBER_AVAILABLE):
+            return self._converter_entry
+        
+        pdfs = [p for p in paths if p.suffix.lower() == '.pdf']
+        if not pdfs or not all(pdf_has_embedded_text(str(p)) for p in pdfs):
+            return self._converter_entry
+        
+        logger.info("PDF enthält eingebetteten Text - OCR wird übersprungen")
+        return self._get_converter(do_ocr=False)
+    
+    def _cache_file(self, path: Path, suffix: str, entry: _ConverterEntry) -> Optional[Path]:
+        """Cache-Datei für Dateiinhalt + aktuelle Pipeline-Optionen (None ohne Cache)"""
+        if not self.use_cache:
+            return None
+        
+        h = hashlib.blake2b(digest_size=20)
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        h.update(_options_fingerprint(entry.pipeline_options))
+        h.update(_options_fingerprint(getattr(entry.pipeline_options, 'pdf_options', None)))
+        # "raw": der Cache enthält nur den Docling-Export, ohne pfadabhängige Metadaten
+        h.update(f"{self.use_vlm}|{self.use_easyocr}|{self.table_mode}|{DOCLING_VERSION}|raw".encode('utf-8'))
+        return CACHE_DIR / f"{h.hexdigest()}{suffix}"
+    
+    @staticmethod
+    def _load_cached(cache_file: Optional[Path]) -> Any:
+        """Liest einen gecachten Export (.json als Dictionary, .md als Text), sonst None"""
+        if cache_file is None or not cache_file.exists():
+            return None
+        try:
+            if cache_file.suffix == '.json':
+                result = orjson.loads(cache_file.read_bytes()) if orjson is not None else json.loads(cache_file.read_text(encoding='utf-8'))
+            else:
+                result = cache_file.read_text(encoding='utf-8')
+        except (OSError, ValueError) as e:
+            logger.warning("Cache-Datei %s unlesbar, konvertiere neu: %s", cache_file.name, e)
+            return None
+        logger.info("Verwende gecachte Konvertierung: %s", cache_file.name)
+        # Zuletzt verwendet: beim Aufräumen zuletzt gelöscht
+        try:
+            os.utime(cache_file)
+        except OSError:
+            pass
+        return result
+    
+    @staticmethod
+    def _store_cached(cache_file: Optional[Path], result: Any) -> None:
+        """Speichert einen Export atomar im Cache (temporäre Datei + os.replace)"""
+        if cache_file is None:
+            return
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        data = _dumps_json(result) if cache_file.suffix == '.json' else result.encode('utf-8')
+        fd, tmp_name = tempfile.mkstemp(dir=CACHE_DIR, prefix=cache_file.name, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_name, cache_file)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+        _prune_cache()
+    
+    def _get_converted(self, path: Path, entry: _ConverterEntry) -> Any:
+        """Konvertiert ein Dokument einmal pro (Pfad, mtime, Größe, OCR) - LRU mit 8 Einträgen"""
+        st = path.stat()
+        do_ocr = getattr(getattr(entry.pipeline_options, 'pdf_options', None), 'do_ocr', None)
+        key = (str(path), st.st_mtime_ns, st.st_size, do_ocr)
+        
+        result = self._convert_cache.get(key)
+        if result is not None:
+            self._convert_cache.move_to_end(key)
+            return result
+        
+        result = entry.converter.convert(str(path))
+        self._convert_cache[key] = result
+        if len(self._convert_cache) > self._convert_cache_size:
+            self._convert_cache.popitem(last=False)
+        return result
+    
     def validate_file(self, file_path: str) -> Path:
         """
         Validiert die Eingabedatei
@@ -144,18 +447,22 @@ class DoclingProcessor:
         """
         path = Path(file_path)
         
-        if not path.exists():
-            raise ValueError(f"Datei nicht gefunden: {file_path}")
-        
-        if not path.is_file():
-            raise ValueError(f"Pfad ist keine Datei: {file_path}")
-        
+        # Format zuerst prüfen, das braucht keinen Dateisystemzugriff
         suffix = path.suffix.lower()
-        if suffix not in self.SUPPORTED_FORMATS:
+        if suffix not in self._SUPPORTED_SUFFIXES:
             supported = ", ".join(self.SUPPORTED_FORMATS.keys())
             raise ValueError(f"Nicht unterstütztes Format: {suffix}\nUnterstützte Formate: {supported}")
         
-        logger.info(f"Verarbeite {self.SUPPORTED_FORMATS[suffix]}: {path.name}")
+        # Ein einziger stat()-Aufruf statt exists() + is_file()
+        try:
+            st = path.stat()
+        except OSError:
+            raise ValueError(f"Datei nicht gefunden: {file_path}")
+        
+        if not stat.S_ISREG(st.st_mode):
+            raise ValueError(f"Pfad ist keine Datei: {file_path}")
+        
+        logger.info("Verarbeite %s: %s", self.SUPPORTED_FORMATS[suffix], path.name)
         return path
     
     def convert_document(self, file_path: str) -> Dict[str, Any]:
@@ -170,41 +477,46 @@ class DoclingProcessor:
         """
         path = self.validate_file(file_path)
         
-        logger.info(f"Starte Konvertierung mit {'SmolDocling VLM' if self.use_vlm else 'Standard Pipeline'}...")
+        logger.info("Starte Konvertierung mit %s...", 'SmolDocling VLM' if self.use_vlm else 'Standard Pipeline')
         
         try:
-            # Dokument konvertieren
-            result = self.converter.convert(str(path))
-            
-            # Zu Dictionary exportieren
-            doc_dict = result.document.export_to_dict()
-            
-            # Metadaten hinzufügen
-            doc_dict['metadata'] = {
-                'source_file': str(path),
-                'file_type': path.suffix.lower(),
-                'processing_pipeline': 'SmolDocling VLM' if self.use_vlm else 'Standard',
-                'ocr_engine': 'EasyOCR' if self.use_easyocr else 'SmolDocling VLM'
-            }
-            
-            # Statistiken
-            if 'pages' in doc_dict:
-                doc_dict['metadata']['page_count'] = len(doc_dict.get('pages', []))
-            
-            # Tabellen zählen
-            table_count = 0
-            if 'tables' in doc_dict:
-                table_count = len(doc_dict.get('tables', []))
-            doc_dict['metadata']['table_count'] = table_count
-            
-            logger.info(f"Konvertierung erfolgreich: {doc_dict['metadata'].get('page_count', 0)} Seiten, {table_count} Tabellen")
-            
-            return doc_dict
+            entry = self._select_converter([path])
+            cache_file = self._cache_file(path, '.json', entry)
+            doc_dict = self._load_cached(cache_file)
+            if doc_dict is None:
+                # Dokument konvertieren
+                doc_dict = self._get_converted(path, entry).document.export_to_dict()
+                self._store_cached(cache_file, doc_dict)
+            return self._build_dict(path, doc_dict)
             
         except Exception as e:
-            logger.error(f"Fehler bei der Konvertierung: {e}")
+            logger.error("Fehler bei der Konvertierung: %s", e)
             raise
     
+    def _build_dict(self, path: Path, doc_dict: Dict[str, Any]) -> Dict[str, Any]:
+        """Ergänzt den Dictionary-Export um die Metadaten zum aktuellen Pfad"""
+        # Metadaten hinzufügen
+        doc_dict['metadata'] = {
+            'source_file': str(path),
+            'file_type': path.suffix.lower(),
+            'processing_pipeline': 'SmolDocling VLM' if self.use_vlm else 'Standard',
+            'ocr_engine': 'EasyOCR' if self.use_easyocr else 'SmolDocling VLM'
+        }
+        
+        # Statistiken
+        if 'pages' in doc_dict:
+            doc_dict['metadata']['page_count'] = len(doc_dict.get('pages', []))
+        
+        # Tabellen zählen
+        table_count = 0
+        if 'tables' in doc_dict:
+            table_count = len(doc_dict.get('tables', []))
+        doc_dict['metadata']['table_count'] = table_count
+        
+        logger.info("Konvertierung erfolgreich: %s Seiten, %s Tabellen", doc_dict['metadata'].get('page_count', 0), table_count)
+        
+        return doc_dict
+    
     def export_as_markdown(self, file_path: str) -> str:
         """
         Exportiert Dokument als Markdown
@@ -220,23 +532,32 @@ class DoclingProcessor:
         logger.info("Exportiere als Markdown...")
         
         try:
-            result = self.converter.convert(str(path))
-            markdown = result.document.export_to_markdown()
-            
-            # Header mit Metadaten hinzufügen
-            header = f"# Dokument: {path.name}\n\n"
-            header += f"**Format:** {self.SUPPORTED_FORMATS[path.suffix.lower()]}\n"
-            header += f"**Verarbeitet mit:** {'SmolDocling VLM' if self.use_vlm else 'Standard Pipeline'}\n\n"
-            header += "---\n\n"
-            
-            return header + markdown
+            entry = self._select_converter([path])
+            cache_file = self._cache_file(path, '.md', entry)
+            markdown = self._load_cached(cache_file)
+            if markdown is None:
+                markdown = self._get_converted(path, entry).document.export_to_markdown()
+                self._store_cached(cache_file, markdown)
+            return self._build_markdown(path, markdown)
             
         except Exception as e:
-            logger.error(f"Fehler beim Markdown Export: {e}")
+            logger.error("Fehler beim Markdown Export: %s", e)
             raise
     
+    def _build_markdown(self, path: Path, markdown: str) -> str:
+        """Stellt dem Markdown-Export einen Header zum aktuellen Pfad voran"""
+        # Header mit Metadaten hinzufügen
+        header = f"# Dokument: {path.name}\n\n"
+        header += f"**Format:** {self.SUPPORTED_FORMATS[path.suffix.lower()]}\n"
+        header += f"**Verarbeitet mit:** {'SmolDocling VLM' if self.use_vlm else 'Standard Pipeline'}\n\n"
+        header += "---\n\n"
+        
+        return header + markdown
+    
     def ask_question(self, document_content: Dict[str, Any], question: str, 
-                    model: str = "qwen3:latest") -> Dict[str, Any]:
+                    model: str = "qwen3:latest",
+                    context_tokens: int = 6000,
+                    max_answer_chars: Optional[int] = None) -> Dict[str, Any]:
         """
         Stellt eine Frage zum Dokumentinhalt via LLM
         
@@ -244,6 +565,9 @@ class DoclingProcessor:
             document_content: Konvertiertes Dokument
             question: Frage zum Dokument
             model: LLM Modell (default: qwen3:latest)
+            context_tokens: Token-Budget für den Dokumenttext im Prompt
+            max_answer_chars: Generierung abbrechen, sobald die Antwort so lang ist
+                (Ergebnis enthält dann "gekuerzt": True)
             
         Returns:
             Antwort als Dictionary
@@ -254,68 +578,86 @@ class DoclingProcessor:
                 "message": "Bitte installieren Sie ollama mit: pip install ollama"
             }
         
-        logger.info(f"Stelle Frage an LLM ({model}): {question}")
+        logger.info("Stelle Frage an LLM (%s): %s", model, question)
         
         try:
             # Dokument-Text extrahieren
-            doc_text = self._extract_text_from_dict(document_content)
+            doc_text = _truncate_to_tokens(self._extract_text_from_dict(document_content), context_tokens)
             
             # Prompt erstellen
-            prompt = f"""Du bist ein hilfreicher Assistent, der Fragen zu Dokumenten beantwortet.
-            
-Hier ist der Inhalt des Dokuments:
-
-{doc_text[:10000]}  # Limitiere auf 10000 Zeichen für Context
-
-Basierend auf diesem Dokument, beantworte bitte folgende Frage:
-{question}
-
-Antworte im JSON Format mit folgender Struktur:
-{{
-    "frage": "{question}",
-    "antwort": "Deine detaillierte Antwort hier",
-    "kontext": "Relevanter Textausschnitt aus dem Dokument",
-    "konfidenz": "hoch/mittel/niedrig"
-}}"""
+            prompt = "".join((_PROMPT_PREFIX, doc_text, _PROMPT_MID, question,
+                              _PROMPT_FORMAT, question, _PROMPT_SUFFIX))
             
-            # Anfrage an Ollama
-            response = self.ollama_client.chat(
+            # Anfrage an Ollama (gestreamt)
+            stream = self.ollama_client.chat(
+                stream=True,
                 model=model,
                 messages=[
-                    {
-                        "role": "system",
-                        "content": "Du bist ein Experte für Dokumentanalyse. Antworte immer im angeforderten JSON Format."
-                    },
+                    self._SYSTEM_MSG,
                     {
                         "role": "user",
                         "content": prompt
                     }
                 ],
                 format="json",
-                options={
-                    "temperature": 0.3,  # Niedrigere Temperatur für faktische Antworten
-                    "top_p": 0.9
-                }
+                options=self._OPTS
             )
             
-            # Antwort parsen
-            if response and 'message' in response:
-                answer_text = response['message']['content']
-                try:
-                    answer_json = json.loads(answer_text)
+            # Antwort einlesen, Abbruch sobald ein vollständiges JSON-Objekt vorliegt
+            answer_text = ""
+            antwort_start = None
+            watch_antwort = max_answer_chars is not None
+            for chunk in stream:
+                teil = chunk['message']['content']
+                answer_text += teil
+                logger.debug("LLM Antwort: %s Zeichen empfangen", len(answer_text))
+                if watch_antwort:
+                    if antwort_start is None:
+                        match = _ANTWORT_START_RE.search(answer_text)
+                        antwort_start = match.end() if match else None
+                    if antwort_start is not None:
+                        raw = answer_text[antwort_start:]
+                        if _JSON_STRING_END_RE.match(raw):
+                            # Antwort vollständig, normal zu Ende lesen
+                            watch_antwort = False
+                        elif len(raw) >= max_answer_chars:
+                            antwort = _decode_partial_json_string(raw)
+                            # Escape-Sequenzen zählen roh mehrfach, daher dekodiert vergleichen
+                            if len(antwort) >= max_answer_chars:
+                                stream.close()
+                                logger.info("LLM Antwort nach %s Zeichen abgebrochen", max_answer_chars)
+                                return {
+                                    "frage": question,
+                                    "antwort": antwort,
+                                    "kontext": "",
+                                    "konfidenz": "unbekannt",
+                                    "gekuerzt": True
+                                }
+                if '}' in teil and answer_text.rstrip().endswith('}'):
+                    try:
+                        answer_json = json.loads(answer_text)
+                    except json.JSONDecodeError:
+                        continue
+                    stream.close()
                     logger.info("LLM Antwort erfolgreich erhalten")
                     return answer_json
-                except json.JSONDecodeError:
-                    # Fallback wenn JSON parsing fehlschlägt
-                    return {
-                        "frage": question,
-                        "antwort": answer_text,
-                        "kontext": "",
-                        "konfidenz": "mittel"
-                    }
+            
+            # Antwort parsen
+            try:
+                answer_json = json.loads(answer_text)
+                logger.info("LLM Antwort erfolgreich erhalten")
+                return answer_json
+            except json.JSONDecodeError:
+                # Fallback wenn JSON parsing fehlschlägt
+                return {
+                    "frage": question,
+                    "antwort": answer_text,
+                    "kontext": "",
+                    "konfidenz": "mittel"
+                }
             
         except Exception as e:
-            logger.error(f"Fehler bei LLM Anfrage: {e}")
+            logger.error("Fehler bei LLM Anfrage: %s", e)
             return {
                 "error": str(e),
                 "frage": question,
@@ -323,35 +665,29 @@ Antworte im JSON Format mit folgender Struktur:
             }
     
     def _extract_text_from_dict(self, doc_dict: Dict[str, Any]) -> str:
-        """Extrahiert Text aus dem Dokument Dictionary"""
-        text_parts = []
-        
-        # Haupttext extrahieren
-        if 'text' in doc_dict:
-            text_parts.append(doc_dict['text'])
-        
-        # Seiten durchgehen
-        if 'pages' in doc_dict:
-            for page in doc_dict['pages']:
-                if 'text' in page:
-                    text_parts.append(page['text'])
-        
-        # Paragraphen
-        if 'paragraphs' in doc_dict:
-            for para in doc_dict['paragraphs']:
-                if 'text' in para:
-                    text_parts.append(para['text'])
+        """Extrahiert Text aus dem Dokument Dictionary (einmalig, danach aus '_cached_text')"""
+        cached = doc_dict.get('_cached_text')
+        if cached is not None:
+            return cached
         
-        # Tabellen als Text
-        if 'tables' in doc_dict:
-            for table in doc_dict['tables']:
-                text_parts.append("[Tabelle gefunden]")
-                if 'cells' in table:
-                    for row in table['cells']:
-                        row_text = " | ".join([str(cell.get('text', '')) for cell in row])
-                        text_parts.append(row_text)
+        pages = doc_dict.get('pages', ())
+        paragraphs = doc_dict.get('paragraphs', ())
+        tables = doc_dict.get('tables', ())
         
-        return "\n\n".join(text_parts)
+        text = "\n\n".join(itertools.chain(
+            # Haupttext
+            (doc_dict['text'],) if 'text' in doc_dict else (),
+            # Seiten und Paragraphen
+            (page['text'] for page in pages if 'text' in page),
+            (para['text'] for para in paragraphs if 'text' in para),
+            # Tabellen als Text (ein Block pro Tabelle, eine Zeile pro Tabellenzeile)
+            ("\n".join(itertools.chain(
+                ("[Tabelle gefunden]",),
+                (" | ".join(str(cell.get('text', '')) for cell in row) for row in table.get('cells', ()))
+            )) for table in tables)
+        ))
+        doc_dict['_cached_text'] = text
+        return text
     
     def process(self, file_path: str, output_format: str = "json", 
                question: Optional[str] = None, model: str = "qwen3:latest") -> Any:
@@ -378,12 +714,114 @@ Antworte im JSON Format mit folgender Struktur:
             if question and output_format.lower() == "json":
                 qa_result = self.ask_question(result, question, model)
                 result['qa'] = qa_result
+                result.pop('_cached_text', None)
             
             return result
             
         except Exception as e:
-            logger.error(f"Verarbeitungsfehler: {e}")
+            logger.error("Verarbeitungsfehler: %s", e)
             raise
+    
+    def process_batch(self, file_paths: List[str], output_format: str = "json",
+                      question: Optional[str] = None,
+                      model: str = "qwen3:latest") -> Iterator[Tuple[Path, Any]]:
+        """
+        Verarbeitet mehrere Dokumente in einem convert_all() Durchlauf
+        
+        Die Pipeline (Modelle, Layout-Gewichte) wird nur einmal initialisiert.
+        Ergebnisse werden einzeln geliefert, damit nie alle Dokumente gleichzeitig
+        im Speicher liegen.
+        
+        Args:
+            file_paths: Pfade zu den Eingabedateien
+            output_format: Ausgabeformat (json/markdown)
+            question: Optionale Frage für Q&A (nur json)
+            model: LLM Modell für Q&A
+            
+        Yields:
+            (Pfad, Ergebnis) pro Dokument in Eingabereihenfolge
+        """
+        paths = [self.validate_file(p) for p in file_paths]
+        markdown = output_format.lower() == "markdown"
+        
+        entry = self._select_converter(paths)
+        cache_files = [self._cache_file(p, '.md' if markdown else '.json', entry) for p in paths]
+        cached = [self._load_cached(c) for c in cache_files]
+        
+        # Nur fehlende Dokumente konvertieren (convert_all liefert lazy in Eingabereihenfolge)
+        missing = [str(p) for p, c in zip(paths, cached) if c is None]
+        logger.info("Starte Batch-Konvertierung von %s Dokumenten (%s aus Cache)...", len(missing), len(paths) - len(missing))
+        results = iter(entry.converter.convert_all(missing)) if missing else iter(())
+        
+        for path, cache_file, result in zip(paths, cache_files, cached):
+            if result is None:
+                document = next(results).document
+                result = document.export_to_markdown() if markdown else document.export_to_dict()
+                self._store_cached(cache_file, result)
+            
+            if markdown:
+                yield path, self._build_markdown(path, result)
+                continue
+            
+            doc_dict = self._build_dict(path, result)
+            if question:
+                doc_dict['qa'] = self.ask_question(doc_dict, question, model)
+                doc_dict.pop('_cached_text', None)
+            yield path, doc_dict
+
+
+def _options_fingerprint(options: Any) -> bytes:
+    """Stabile Darstellung von Pipeline-Optionen für den Cache-Schlüssel"""
+    if hasattr(options, 'model_dump_json'):
+        return options.model_dump_json().encode('utf-8')
+    return repr(options).encode('utf-8')
+
+
+def _prune_cache(max_bytes: int = CACHE_MAX_BYTES) -> None:
+    """Löscht die am längsten nicht verwendeten Cache-Dateien, bis CACHE_DIR unter max_bytes liegt"""
+    files = []
+    try:
+        with os.scandir(CACHE_DIR) as entries:
+            for e in entries:
+                if e.is_file() and not e.name.endswith('.tmp'):
+                    st = e.stat()
+                    files.append((st.st_mtime_ns, st.st_size, e.path))
+    except OSError:
+        return
+    
+    total = sum(size for _, size, _ in files)
+    for _, size, file_path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.unlink(file_path)
+        except OSError:
+            continue
+        total -= size
+
+
+def _dumps_json(obj: Any) -> bytes:
+    """Serialisiert ein Objekt als eingerücktes UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
+def _write_output(result: Any, output_format: str, output_file: Optional[str]) -> None:
+    """Schreibt ein Ergebnis (json/markdown) als UTF-8 Bytes in eine Datei oder auf stdout"""
+    if output_format == 'json':
+        output = _dumps_json(result)
+    else:
+        output = result.encode('utf-8')
+    
+    if output_file:
+        with open(output_file, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+            f.write(output)
+        print(f"✓ Ausgabe gespeichert in: {output_file}")
+    else:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(output + b'\n')
+        sys.stdout.buffer.flush()
 
 
 def main():
@@ -404,14 +842,18 @@ Beispiele:
   
   # Mit speziellem LLM Modell
   python docling_processor.py --file dokument.pdf --question "Zusammenfassung?" --model llama3.3:latest
+  
+  # Mehrere Dateien in einem Durchlauf (Pipeline wird nur einmal geladen)
+  python docling_processor.py --file a.pdf b.pdf c.pdf --output-dir output
         """
     )
     
     parser.add_argument(
         '--file', '-f',
         type=str,
+        nargs='+',
         required=True,
-        help='Pfad zur Eingabedatei (PDF, DOCX, XLSX, PPTX, HTML, MD, Bilder)'
+        help='Pfad zur Eingabedatei (PDF, DOCX, XLSX, PPTX, HTML, MD, Bilder), mehrere möglich'
     )
     
     parser.add_argument(
@@ -442,6 +884,13 @@ Beispiele:
         help='Ollama API URL (default: https://fs.aiora.rest)'
     )
     
+    parser.add_argument(
+        '--llm-timeout',
+        type=float,
+        default=600.0,
+        help='Lese-Timeout für LLM Antworten in Sekunden, 0 = unbegrenzt (default: 600)'
+    )
+    
     parser.add_argument(
         '--no-vlm',
         action='store_true',
@@ -454,12 +903,50 @@ Beispiele:
         help='EasyOCR als zusätzliche OCR-Engine verwenden'
     )
     
+    parser.add_argument(
+        '--force-ocr',
+        action='store_true',
+        help='OCR auch bei PDFs mit eingebettetem Text ausführen'
+    )
+    
+    parser.add_argument(
+        '--accurate-tables',
+        action='store_true',
+        help='TableFormer im ACCURATE Modus (langsamer, default: FAST)'
+    )
+    
+    parser.add_argument(
+        '--num-threads',
+        type=int,
+        help='Threads für Layout/OCR/TableFormer Modelle (default: Anzahl CPU-Kerne)'
+    )
+    
+    parser.add_argument(
+        '--device',
+        type=str,
+        choices=['auto', 'cpu', 'cuda', 'mps'],
+        default='auto',
+        help='Beschleuniger für die Modelle (default: auto)'
+    )
+    
+    parser.add_argument(
+        '--cache',
+        action='store_true',
+        help=f'Konvertierte Dokumente in {CACHE_DIR} zwischenspeichern (max. {CACHE_MAX_BYTES >> 20} MiB)'
+    )
+    
     parser.add_argument(
         '--output-file',
         type=str,
         help='Optionale Ausgabedatei (sonst stdout)'
     )
     
+    parser.add_argument(
+        '--output-dir',
+        type=str,
+        help='Ausgabeverzeichnis bei mehreren Dateien (<name>.json bzw. <name>.md)'
+    )
+    
     parser.add_argument(
         '--verbose', '-v',
         action='store_true',
@@ -468,6 +955,12 @@ Beispiele:
     
     args = parser.parse_args()
     
+    if len(args.file) > 1:
+        if args.output_file:
+            parser.error("--output-file ist nur bei einer Eingabedatei möglich, bitte --output-dir verwenden")
+        if not args.output_dir:
+            parser.error("Bei mehreren Eingabedateien ist --output-dir erforderlich")
+    
     # Logging Level setzen
     if args.verbose:
         logging.getLogger().setLevel(logging.DEBUG)
@@ -476,34 +969,40 @@ Beispiele:
     processor = DoclingProcessor(
         use_vlm=not args.no_vlm,
         use_easyocr=args.use_easyocr,
-        ollama_url=args.ollama_url
+        ollama_url=args.ollama_url,
+        llm_timeout=args.llm_timeout or None,
+        num_threads=args.num_threads,
+        device=args.device,
+        table_mode='accurate' if args.accurate_tables else 'fast',
+        force_ocr=args.force_ocr,
+        use_cache=args.cache
     )
     
     try:
-        # Dokument verarbeiten
-        result = processor.process(
-            file_path=args.file,
-            output_format=args.output_format,
-            question=args.question,
-            model=args.model
-        )
-        
-        # Ausgabe formatieren
-        if args.output_format == 'json':
-            output = json.dumps(result, indent=2, ensure_ascii=False)
-        else:
-            output = result
-        
-        # Ausgabe schreiben
-        if args.output_file:
-            with open(args.output_file, 'w', encoding='utf-8') as f:
-                f.write(output)
-            print(f"✓ Ausgabe gespeichert in: {args.output_file}")
+        if len(args.file) == 1:
+            # Dokument verarbeiten
+            result = processor.process(
+                file_path=args.file[0],
+                output_format=args.output_format,
+                question=args.question,
+                model=args.model
+            )
+            _write_output(result, args.output_format, args.output_file)
         else:
-            print(output)
+            # Batch: alle Dokumente mit derselben Pipeline, jedes Ergebnis sofort schreiben
+            output_dir = Path(args.output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
+            suffix = '.md' if args.output_format == 'markdown' else '.json'
+            for path, result in processor.process_batch(
+                args.file,
+                output_format=args.output_format,
+                question=args.question,
+                model=args.model
+            ):
+                _write_output(result, args.output_format, str(output_dir / f"{path.stem}{suffix}"))
         
     except Exception as e:
-        logger.error(f"Fehler: {e}")
+        logger.error("Fehler: %s", e)
         sys.exit(1)
 
 
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Gemeinsame PDF-Hilfsfunktionen für docling_processor und simple_pdf_processor
+"""
+
+import logging
+
+# Optional: pdfplumber zum Prüfen der Text-Ebene
+try:
+    import pdfplumber
+    PDFPLUMBER_AVAILABLE = True
+except ImportError:
+    PDFPLUMBER_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+
+def pdf_has_embedded_text(pdf_path: str, sample_pages: int = 3, min_chars: int = 50) -> bool:
+    """Prüft an den ersten Seiten, ob das PDF eingebetteten Text hat (dann ist kein OCR nötig)"""
+    if not PDFPLUMBER_AVAILABLE:
+        return False
+    try:
+        with pdfplumber.open(pdf_path) as pdf:
+            pages = pdf.pages[:sample_pages]
+            return bool(pages) and any(len(page.chars) > min_chars for page in pages)
+    except Exception as e:
+        logger.warning("Konnte Text-Ebene von %s nicht prüfen: %s", pdf_path, e)
+        return False
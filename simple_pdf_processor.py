@@ -4,21 +4,53 @@ Vereinfachter PDF Processor für Sparkasse Kontoauszüge
 Nutzt pdfplumber für PDF-Extraktion
 """
 
+import io
 import json
+import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 import pdfplumber
 import ollama
-from typing import Dict, Any, Optional
+from typing import Callable, Dict, Any, Optional, Tuple
 import logging
 
+# Optional: orjson für schnellere JSON-Serialisierung
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Ein Client pro URL (Verbindung bleibt über mehrere Fragen offen)
+_OLLAMA_CLIENTS: Dict[str, ollama.Client] = {}
+
+# Puffergröße für Ausgabedateien (weniger write()-Syscalls)
+WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _has_ruling_lines(page: Any, min_edges: int = 2) -> bool:
+    """Günstige Vorprüfung: hat die Seite genug horizontale Linien für eine Tabelle?"""
+    h_edges = 0
+    for edge in page.edges:
+        if edge['orientation'] == 'h':
+            h_edges += 1
+            if h_edges >= min_edges:
+                return True
+    return False
+
 
-def extract_pdf_content(pdf_path: str) -> Dict[str, Any]:
-    """Extrahiert Inhalt aus PDF mit pdfplumber"""
-    logger.info(f"Verarbeite PDF: {pdf_path}")
+def extract_pdf_content(pdf_path: str,
+                        page_sink: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Extrahiert Inhalt aus PDF mit pdfplumber
+    
+    Mit page_sink wird jede Seite direkt weitergereicht statt in result["pages"]
+    gesammelt (z.B. zum inkrementellen Schreiben großer Auszüge).
+    """
+    logger.info("Verarbeite PDF: %s", pdf_path)
     
     result = {
         "file": pdf_path,
@@ -36,7 +68,8 @@ def extract_pdf_content(pdf_path: str) -> Dict[str, Any]:
                 "file_name": Path(pdf_path).name
             }
             
-            all_text = []
+            # Gesamttext direkt in einen Puffer schreiben (keine Liste + join-Kopie)
+            text_io = io.StringIO()
             
             # Seiten durchgehen
             for i, page in enumerate(pdf.pages):
@@ -50,10 +83,12 @@ def extract_pdf_content(pdf_path: str) -> Dict[str, Any]:
                 text = page.extract_text()
                 if text:
                     page_data["text"] = text
-                    all_text.append(text)
+                    if text_io.tell():
+                        text_io.write("\n\n")
+                    text_io.write(text)
                 
-                # Tabellen extrahieren
-                tables = page.extract_tables()
+                # Tabellen extrahieren (nur wenn die Seite überhaupt Linien hat)
+                tables = page.extract_tables() if _has_ruling_lines(page) else []
                 if tables:
                     for table in tables:
                         # Tabelle als strukturierte Daten
@@ -63,29 +98,43 @@ def extract_pdf_content(pdf_path: str) -> Dict[str, Any]:
                             "data": table
                         })
                 
-                result["pages"].append(page_data)
+                # Seiten-Cache von pdfplumber (Zeichen, Bilder) sofort freigeben
+                page.flush_cache()
+                
+                if page_sink is not None:
+                    page_sink(page_data)
+                else:
+                    result["pages"].append(page_data)
             
             # Gesamttext
-            result["text"] = "\n\n".join(all_text)
+            result["text"] = text_io.getvalue()
             result["metadata"]["total_characters"] = len(result["text"])
             result["metadata"]["table_count"] = len(result["tables"])
             
-            logger.info(f"✓ Erfolgreich extrahiert: {result['metadata']['page_count']} Seiten, {result['metadata']['table_count']} Tabellen")
+            logger.info("✓ Erfolgreich extrahiert: %s Seiten, %s Tabellen", result['metadata']['page_count'], result['metadata']['table_count'])
             
     except Exception as e:
-        logger.error(f"Fehler bei PDF-Extraktion: {e}")
+        logger.error("Fehler bei PDF-Extraktion: %s", e)
         result["error"] = str(e)
     
     return result
 
 
+def _get_client(ollama_url: str) -> ollama.Client:
+    """Gemeinsamer Ollama Client für eine URL"""
+    client = _OLLAMA_CLIENTS.get(ollama_url)
+    if client is None:
+        client = _OLLAMA_CLIENTS[ollama_url] = ollama.Client(host=ollama_url)
+    return client
+
+
 def ask_llm_question(content: Dict[str, Any], question: str, 
                      model: str = "qwen3:latest",
                      ollama_url: str = "https://fs.aiora.rest") -> Dict[str, Any]:
     """Stellt eine Frage zum extrahierten Inhalt via Ollama"""
     
     try:
-        client = ollama.Client(host=ollama_url)
+        client = _get_client(ollama_url)
         
         # Kontext vorbereiten (limitiert auf 8000 Zeichen)
         context = content["text"][:8000] if content.get("text") else "Kein Text gefunden"
@@ -120,32 +169,58 @@ Antworte im JSON Format:
                 return {"antwort": response['message']['content']}
     
     except Exception as e:
-        logger.error(f"LLM Fehler: {e}")
+        logger.error("LLM Fehler: %s", e)
         return {"error": str(e)}
     
     return {"error": "Keine Antwort erhalten"}
 
 
+def _dumps_json(obj: Any) -> bytes:
+    """Serialisiert ein Objekt als eingerücktes UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode('utf-8')
+
+
 def process_pdf(pdf_path: str, output_path: str, question: Optional[str] = None) -> None:
     """Hauptfunktion für PDF-Verarbeitung"""
     
-    # PDF-Inhalt extrahieren
-    content = extract_pdf_content(pdf_path)
-    
-    # Optional: LLM-Frage
-    if question:
-        logger.info(f"Stelle Frage: {question}")
-        qa_result = ask_llm_question(content, question)
-        content["qa"] = qa_result
-    
-    # Speichern
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(content, f, indent=2, ensure_ascii=False)
+    with open(output_path, 'wb', buffering=WRITE_BUFFER_SIZE) as f:
+        # Seiten werden während der Extraktion einzeln geschrieben
+        f.write(b'{\n  "file": ' + _dumps_json(pdf_path) + b',\n  "pages": [\n')
+        page_count = 0
+        
+        def write_page(page_data: Dict[str, Any]) -> None:
+            nonlocal page_count
+            if page_count:
+                f.write(b',\n')
+            f.write(_dumps_json(page_data))
+            page_count += 1
+        
+        # PDF-Inhalt extrahieren
+        content = extract_pdf_content(pdf_path, page_sink=write_page)
+        del content["file"], content["pages"]
+        
+        # Optional: LLM-Frage
+        if question:
+            logger.info("Stelle Frage: %s", question)
+            qa_result = ask_llm_question(content, question)
+            content["qa"] = qa_result
+        
+        # Restliche Felder (tables, text, metadata, ...) ohne die öffnende Klammer anhängen
+        f.write(b'\n  ],' + _dumps_json(content)[1:])
     
-    logger.info(f"✓ Gespeichert: {output_path}")
+    logger.info("✓ Gespeichert: %s", output_path)
     print(f"✓ {Path(pdf_path).name} -> {output_path}")
 
 
+def _worker(job: Tuple[str, str]) -> str:
+    """Verarbeitet ein PDF in einem eigenen Prozess (PDFs sind voneinander unabhängig)"""
+    pdf_path, output_path = job
+    process_pdf(pdf_path, output_path)
+    return output_path
+
+
 def main():
     # Liste der PDFs
     pdf_files = [
@@ -160,13 +235,19 @@ def main():
     print("PDF BATCH PROCESSOR - Sparkasse Kontoauszüge")
     print("="*60)
     
+    jobs = []
     for pdf_path in pdf_files:
         if Path(pdf_path).exists():
             output_name = f"Konto_Auszug_2022_{Path(pdf_path).stem.split('_')[-1]}_result.json"
-            process_pdf(pdf_path, output_name)
+            jobs.append((pdf_path, output_name))
         else:
             print(f"❌ Datei nicht gefunden: {pdf_path}")
     
+    # PDFs parallel verarbeiten (Ausgabezeilen können sich verschränken)
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(len(jobs), os.cpu_count() or 1)) as executor:
+            list(executor.map(_worker, jobs))
+    
     print("="*60)
     print("✓ Verarbeitung abgeschlossen!")
     print("="*60)
@@ -4,22 +4,56 @@ Test-Skript für Docling Document Processor
 Testet verschiedene Funktionen und Dokumenttypen
 """
 
+import argparse
+import functools
+import hashlib
+import io
 import json
+import os
+import socket
 import sys
+import tempfile
+import threading
+import unittest
+import weakref
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
+from urllib.parse import urlsplit
+from typing import Any, Callable, Dict, Final, List, Optional
+
+# Thread-Pools von torch/BLAS begrenzen, bevor docling_processor sie lädt; die
+# Tests laufen selbst parallel (ThreadPoolExecutor bzw. pytest-xdist Worker)
+os.environ.setdefault("OMP_NUM_THREADS", "1" if os.environ.get("PYTEST_XDIST_WORKER") else "4")
+os.environ.setdefault("MKL_NUM_THREADS", os.environ["OMP_NUM_THREADS"])
+os.environ.setdefault("OPENBLAS_NUM_THREADS", os.environ["OMP_NUM_THREADS"])
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
 from docling_processor import DoclingProcessor
 import logging
 
+try:
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+# Optional: orjson für schnelleres Schreiben der Ergebnisse
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Logging konfigurieren
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-
-def create_test_files():
-    """Erstellt einfache Testdateien"""
-    
-    # Test Markdown
-    test_md = """# Test Dokument
+# Testinhalte, einmalig als UTF-8 kodiert
+TEST_MD_BYTES = """# Test Dokument
 
 ## Einleitung
 Dies ist ein Test-Dokument für den Docling Processor.
@@ -38,14 +72,9 @@ Dies ist ein Test-Dokument für den Docling Processor.
 
 ## Zusammenfassung
 Dieses Dokument testet die Grundfunktionen des Processors.
-"""
-    
-    with open("test_document.md", "w", encoding="utf-8") as f:
-        f.write(test_md)
-    logger.info("✓ test_document.md erstellt")
-    
-    # Test HTML
-    test_html = """<!DOCTYPE html>
+""".encode("utf-8")
+
+TEST_HTML_BYTES = """<!DOCTYPE html>
 <html>
 <head><title>Test HTML</title></head>
 <body>
@@ -56,196 +85,448 @@ Dieses Dokument testet die Grundfunktionen des Processors.
         <tr><td>Daten 1</td><td>Daten 2</td></tr>
     </table>
 </body>
-</html>"""
+</html>""".encode("utf-8")
+
+OLLAMA_URL = "https://fs.aiora.rest"
+
+# Metadaten-Schlüssel, die die Tests auslesen (interniert für schnelle Dict-Lookups)
+META_KEYS: Final[Dict[str, str]] = {
+    k: sys.intern(k) for k in ("table_count", "page_count", "processing_pipeline")
+}
+
+# Testfragen und Modell für Q&A
+Q_MAIN_POINTS: Final[str] = "Was sind die drei Hauptpunkte im Dokument?"
+Q_MAIN_CONTENT: Final[str] = "Was ist der Hauptinhalt dieses Dokuments?"
+QA_MODEL: Final[str] = "qwen3:latest"
+
+# Hashes der festen Fragen für die Cache-Schlüssel, einmal beim Import berechnet
+Q_MAIN_POINTS_SHA: Final[str] = hashlib.sha256(Q_MAIN_POINTS.encode("utf-8")).hexdigest()
+Q_MAIN_CONTENT_SHA: Final[str] = hashlib.sha256(Q_MAIN_CONTENT.encode("utf-8")).hexdigest()
+_QUESTION_SHAS: Final[Dict[str, str]] = {
+    Q_MAIN_POINTS: Q_MAIN_POINTS_SHA,
+    Q_MAIN_CONTENT: Q_MAIN_CONTENT_SHA,
+}
+
+
+# DOCLING_TEST_REUSE=0 erzwingt frische Processors (z.B. Kaltstart messen)
+REUSE_PROCESSORS = os.environ.get("DOCLING_TEST_REUSE", "1") != "0"
+
+_processors: Dict[bool, DoclingProcessor] = {}
+_processors_lock = threading.Lock()
+
+
+def _new_processor(use_vlm: bool) -> DoclingProcessor:
+    # Docling setzt sonst die torch-Threads auf alle CPU-Kerne; ohne Disk-Cache,
+    # damit jeder Testlauf wirklich konvertiert
+    return DoclingProcessor(use_vlm=use_vlm, ollama_url=OLLAMA_URL,
+                            num_threads=int(os.environ["OMP_NUM_THREADS"]),
+                            use_cache=False)
+
+
+def get_processor(use_vlm: bool) -> DoclingProcessor:
+    """Liefert einen gemeinsam genutzten Processor (max. einer je VLM-Einstellung)"""
+    if not REUSE_PROCESSORS:
+        return _new_processor(use_vlm)
+    with _processors_lock:
+        processor = _processors.get(use_vlm)
+        if processor is None:
+            processor = _processors[use_vlm] = _new_processor(use_vlm)
+        return processor
+
+
+# Ein DoclingProcessor ist nicht threadsicher (Converter, interner LRU-Cache),
+# parallele Tests konvertieren daher pro Processor nacheinander
+_conversion_locks: "weakref.WeakKeyDictionary[DoclingProcessor, threading.Lock]" = weakref.WeakKeyDictionary()
+
+
+def conversion_lock(processor: DoclingProcessor) -> threading.Lock:
+    """Lock, unter dem alle Konvertierungen eines Processors laufen"""
+    with _processors_lock:
+        lock = _conversion_locks.get(processor)
+        if lock is None:
+            lock = _conversion_locks[processor] = threading.Lock()
+        return lock
+
+
+@functools.lru_cache(maxsize=32)
+def _convert_cached(processor: DoclingProcessor, real_path: str,
+                    mtime_ns: int) -> Dict[str, Any]:
+    with conversion_lock(processor):
+        return processor.convert_document(real_path)
+
+
+def get_doc(processor: DoclingProcessor, path: str) -> Dict[str, Any]:
+    """Konvertiert ein Dokument einmal pro Processor und Dateistand
+
+    Die Tests lesen das Ergebnis nur, daher wird es unverändert geteilt.
+    """
+    real_path = os.path.realpath(path)
+    return _convert_cached(processor, real_path, os.stat(real_path).st_mtime_ns)
+
+
+def _dumps_json(obj: Any) -> bytes:
+    """Serialisiert ein Objekt als eingerücktes UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, indent=2, ensure_ascii=False).encode("utf-8")
+
+
+def _prefetch(path: Path) -> None:
+    """Lässt das OS die Datei schon vorab in den Page Cache lesen (No-op ohne posix_fadvise)"""
+    if not hasattr(os, "posix_fadvise"):
+        return
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class SemanticQACache:
+    """Cache für Q&A Antworten, damit wiederholte Testläufe Ollama nicht erneut fragen
+
+    Exakte Treffer über SHA-256 von (Dokument, Frage, Modell). Nur mit
+    semantic=True (und sentence-transformers) werden auch umformulierte Fragen
+    zum selben Dokument erkannt (Kosinus-Ähnlichkeit >= threshold). Standardmäßig
+    aus, sonst bestünde test_llm_qa auch mit der Antwort auf eine andere Frage.
+    """
+
+    EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+    def __init__(self, path: Path, threshold: float = 0.92, semantic: bool = False):
+        self.path = path
+        self.threshold = threshold
+        self.semantic = semantic
+        self._encoder = None
+        try:
+            self._entries: Dict[str, Dict[str, Any]] = json.loads(path.read_bytes())
+        except (OSError, ValueError):
+            self._entries = {}
+
+    @staticmethod
+    def _doc_hash(doc: Dict[str, Any]) -> str:
+        # Interne Felder wie _cached_text gehören nicht zum Schlüssel
+        content = {k: v for k, v in doc.items() if not k.startswith("_")}
+        raw = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _similar(self, doc_hash: str, question: str, model: str) -> Optional[Dict[str, Any]]:
+        if not self.semantic or SentenceTransformer is None:
+            return None
+        candidates = [e for e in self._entries.values()
+                      if e["doc"] == doc_hash and e["model"] == model]
+        if not candidates:
+            return None
+        if self._encoder is None:
+            self._encoder = SentenceTransformer(self.EMBEDDING_MODEL)
+        vectors = self._encoder.encode([question] + [e["question"] for e in candidates],
+                                       normalize_embeddings=True).astype("float32")
+        if faiss is not None:
+            index = faiss.IndexFlatIP(vectors.shape[1])
+            index.add(vectors[1:])
+            scores, ids = index.search(vectors[:1], 1)
+            score, best = float(scores[0][0]), int(ids[0][0])
+        else:
+            similarities = vectors[1:] @ vectors[0]
+            best = int(np.argmax(similarities))
+            score = float(similarities[best])
+        return candidates[best]["answer"] if score >= self.threshold else None
+
+    def get_or_call(self, doc: Dict[str, Any], question: str, model: str,
+                    loader: Callable[[Dict[str, Any], str, str], Dict[str, Any]]) -> Dict[str, Any]:
+        """Liefert die gecachte Antwort oder fragt über loader das LLM"""
+        doc_hash = self._doc_hash(doc)
+        question_sha = (_QUESTION_SHAS.get(question)
+                        or hashlib.sha256(question.encode("utf-8")).hexdigest())
+        key = hashlib.sha256(f"{doc_hash}|{question_sha}|{model}".encode("utf-8")).hexdigest()
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry["answer"]
+        answer = self._similar(doc_hash, question, model)
+        if answer is not None:
+            return answer
+        
+        answer = loader(doc, question, model)
+        if "error" not in answer:
+            self._entries[key] = {"doc": doc_hash, "question": question,
+                                  "model": model, "answer": answer}
+            self._save()
+        return answer
+
+    def _save(self) -> None:
+        """Schreibt den Cache atomar (temporäre Datei + os.replace), z.B. für xdist-Worker"""
+        fd, tmp_name = tempfile.mkstemp(dir=self.path.parent, prefix=self.path.name, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(json.dumps(self._entries, ensure_ascii=False).encode("utf-8"))
+            os.replace(tmp_name, self.path)
+        except BaseException:
+            os.unlink(tmp_name)
+            raise
+
+
+# Wird im __main__ gesetzt, --no-cache lässt ihn aus
+qa_cache: Optional[SemanticQACache] = None
+
+
+class _ThreadStdout:
+    """Leitet print() parallel laufender Tests in einen Puffer pro Thread um"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._local = threading.local()
+
+    def capture(self) -> io.StringIO:
+        self._local.buffer = io.StringIO()
+        return self._local.buffer
+
+    def release(self) -> str:
+        buffer = self._local.__dict__.pop("buffer")
+        return buffer.getvalue()
+
+    def write(self, text: str) -> int:
+        buffer = getattr(self._local, "buffer", None)
+        return (buffer or self._stream).write(text)
+
+    def flush(self) -> None:
+        self._stream.flush()
+
+
+
+# Erreichbarkeit je Ollama URL, nur einmal pro Lauf geprüft
+_ollama_up: Dict[str, bool] = {}
+
+
+def ollama_reachable(url: str, timeout: float = 0.2) -> bool:
+    """Schneller TCP-Check, ob der Ollama Server überhaupt erreichbar ist"""
+    up = _ollama_up.get(url)
+    if up is None:
+        try:
+            parts = urlsplit(url)
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+            with socket.create_connection((parts.hostname, port), timeout=timeout):
+                up = True
+        except (OSError, ValueError):
+            up = False
+        _ollama_up[url] = up
+    return up
+
+
+def banner(title: str, char: str = "=") -> None:
+    """Gibt eine Überschrift mit einem einzigen write() aus"""
+    line = char * 60
+    sys.stdout.write(f"\n{line}\n{title}\n{line}\n")
+
+
+def create_test_files(base: Optional[Path] = None) -> List[Path]:
+    """Erstellt einfache Testdateien in base (default: Arbeitsverzeichnis)"""
+    base = (base or Path.cwd()).resolve()
+    
+    md_file = base / "test_document.md"
+    md_file.write_bytes(TEST_MD_BYTES)
+    logger.info("✓ %s erstellt", md_file)
     
-    with open("test_document.html", "w", encoding="utf-8") as f:
-        f.write(test_html)
-    logger.info("✓ test_document.html erstellt")
+    html_file = base / "test_document.html"
+    html_file.write_bytes(TEST_HTML_BYTES)
+    logger.info("✓ %s erstellt", html_file)
     
-    return ["test_document.md", "test_document.html"]
+    return [md_file, html_file]
 
 
-def test_basic_conversion():
+def test_basic_conversion(processor_vlm: DoclingProcessor, md_file: Path, html_file: Path):
     """Testet Basis-Konvertierung"""
-    print("\n" + "="*60)
-    print("TEST 1: Basis-Konvertierung")
-    print("="*60)
-    
-    processor = DoclingProcessor(use_vlm=True)
+    banner("TEST 1: Basis-Konvertierung")
     
     # Test mit Markdown
-    try:
-        result = processor.convert_document("test_document.md")
-        print("✅ Markdown Konvertierung erfolgreich")
-        print(f"   - Metadaten: {result['metadata']}")
-        
-    except Exception as e:
-        print(f"❌ Fehler bei Markdown: {e}")
+    result = get_doc(processor_vlm, str(md_file))
+    assert result['metadata']['file_type'] == ".md"
+    print("✅ Markdown Konvertierung erfolgreich")
+    print(f"   - Metadaten: {result['metadata']}")
     
     # Test mit HTML
-    try:
-        result = processor.convert_document("test_document.html")
-        print("✅ HTML Konvertierung erfolgreich")
-        print(f"   - Tabellen gefunden: {result['metadata'].get('table_count', 0)}")
-        
-    except Exception as e:
-        print(f"❌ Fehler bei HTML: {e}")
+    result = get_doc(processor_vlm, str(html_file))
+    assert result['metadata']['file_type'] == ".html"
+    print("✅ HTML Konvertierung erfolgreich")
+    print(f"   - Tabellen gefunden: {result['metadata'].get(META_KEYS['table_count'], 0)}")
 
 
-def test_markdown_export():
+def test_markdown_export(processor_fast: DoclingProcessor, html_file: Path):
     """Testet Markdown Export"""
-    print("\n" + "="*60)
-    print("TEST 2: Markdown Export")
-    print("="*60)
+    banner("TEST 2: Markdown Export")
     
-    processor = DoclingProcessor(use_vlm=False)  # Schneller ohne VLM
-    
-    try:
-        markdown = processor.export_as_markdown("test_document.html")
-        print("✅ Markdown Export erfolgreich")
-        print("   Erste 200 Zeichen:")
-        print("   " + markdown[:200].replace("\n", "\n   "))
-        
-    except Exception as e:
-        print(f"❌ Fehler beim Export: {e}")
+    with conversion_lock(processor_fast):
+        markdown = processor_fast.export_as_markdown(str(html_file))
+    assert markdown.strip()
+    print("✅ Markdown Export erfolgreich")
+    print("   Erste 200 Zeichen:")
+    print("   " + markdown[:200].replace("\n", "\n   "))
 
 
-def test_llm_qa():
+def test_llm_qa(processor_fast: DoclingProcessor, md_file: Path):
     """Testet LLM Q&A Funktionalität"""
-    print("\n" + "="*60)
-    print("TEST 3: LLM Q&A Integration")
-    print("="*60)
+    banner("TEST 3: LLM Q&A Integration")
     
-    processor = DoclingProcessor(
-        use_vlm=False,
-        ollama_url="https://fs.aiora.rest"
-    )
+    if not ollama_reachable(processor_fast.ollama_url):
+        raise unittest.SkipTest(f"Ollama nicht erreichbar ({processor_fast.ollama_url})")
     
-    try:
-        # Dokument konvertieren
-        doc = processor.convert_document("test_document.md")
-        
-        # Frage stellen
-        question = "Was sind die drei Hauptpunkte im Dokument?"
-        print(f"Frage: {question}")
-        
-        answer = processor.ask_question(
-            doc, 
-            question,
-            model="qwen3:latest"
-        )
-        
-        if "error" in answer:
-            print(f"⚠️  LLM nicht verfügbar: {answer['error']}")
-            print("   Tipp: Stellen Sie sicher, dass Ollama läuft und das Modell installiert ist:")
-            print("   ollama pull qwen3:latest")
-        else:
-            print("✅ Q&A erfolgreich")
-            print(f"   Antwort: {answer.get('antwort', 'Keine Antwort')[:200]}...")
-            print(f"   Konfidenz: {answer.get('konfidenz', 'unbekannt')}")
-            
-    except Exception as e:
-        print(f"❌ Fehler bei Q&A: {e}")
+    # Dokument konvertieren
+    doc = get_doc(processor_fast, str(md_file))
+    
+    # Frage stellen
+    question = Q_MAIN_POINTS
+    print(f"Frage: {question}")
+    
+    # Ausgegeben werden nur 200 Zeichen, den Rest nicht generieren lassen
+    loader = functools.partial(processor_fast.ask_question, max_answer_chars=256)
+    if qa_cache is None:
+        answer = loader(doc, question, QA_MODEL)
+    else:
+        answer = qa_cache.get_or_call(doc, question, QA_MODEL, loader=loader)
+    
+    assert "error" not in answer, (
+        f"LLM Fehler: {answer['error']} (Modell installiert? ollama pull {QA_MODEL})"
+    )
+    print("✅ Q&A erfolgreich")
+    print(f"   Antwort: {answer.get('antwort', 'Keine Antwort')[:200]}...")
+    print(f"   Konfidenz: {answer.get('konfidenz', 'unbekannt')}")
 
 
-def test_pdf_with_ocr():
+def test_pdf_with_ocr(processor_vlm: DoclingProcessor):
     """Testet PDF mit OCR (wenn PDF verfügbar)"""
-    print("\n" + "="*60)
-    print("TEST 4: PDF mit SmolDocling VLM (falls PDF vorhanden)")
-    print("="*60)
+    banner("TEST 4: PDF mit SmolDocling VLM (falls PDF vorhanden)")
     
     # Suche nach PDF Dateien
-    pdf_files = list(Path(".").glob("*.pdf"))
+    with os.scandir(".") as entries:
+        pdf_files = sorted(Path(e.name) for e in entries
+                           if e.name.lower().endswith(".pdf") and e.is_file())
     
     if not pdf_files:
         print("ℹ️  Keine PDF-Datei gefunden. Überspringe Test.")
         print("   Tipp: Legen Sie eine PDF-Datei im Verzeichnis ab für vollständigen Test")
         return
     
-    pdf_file = pdf_files[0]
-    print(f"Teste mit: {pdf_file}")
+    print(f"Teste mit: {', '.join(map(str, pdf_files))}")
     
-    processor = DoclingProcessor(use_vlm=True, use_easyocr=False)
+    # Die folgenden Dateien liest das OS schon, während die erste konvertiert wird
+    for pdf_file in pdf_files:
+        _prefetch(pdf_file)
     
-    try:
-        result = processor.convert_document(str(pdf_file))
-        print("✅ PDF Verarbeitung erfolgreich")
-        print(f"   - Seiten: {result['metadata'].get('page_count', 0)}")
-        print(f"   - Tabellen: {result['metadata'].get('table_count', 0)}")
-        print(f"   - Pipeline: {result['metadata'].get('processing_pipeline')}")
+    # Nacheinander: alle Konvertierungen eines Processors laufen ohnehin unter
+    # conversion_lock(processor_vlm), ein Thread-Pool brächte hier nichts
+    failed: List[str] = []
+    for pdf_file in pdf_files:
+        try:
+            result = get_doc(processor_vlm, str(pdf_file))
+        except Exception as e:
+            print(f"❌ Fehler bei PDF {pdf_file}: {e}")
+            failed.append(str(pdf_file))
+            continue
+        
+        print(f"✅ PDF Verarbeitung erfolgreich: {pdf_file}")
+        metadata = result['metadata']
+        print(f"   - Seiten: {metadata.get(META_KEYS['page_count'], 0)}")
+        print(f"   - Tabellen: {metadata.get(META_KEYS['table_count'], 0)}")
+        print(f"   - Pipeline: {metadata.get(META_KEYS['processing_pipeline'])}")
         
         # Optional: Speichere Ergebnis
         output_file = f"{pdf_file.stem}_result.json"
-        with open(output_file, "w", encoding="utf-8") as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
-        print(f"   - Ergebnis gespeichert: {output_file}")
-        
-    except Exception as e:
-        print(f"❌ Fehler bei PDF: {e}")
+        try:
+            Path(output_file).write_bytes(_dumps_json(result))
+            print(f"   - Ergebnis gespeichert: {output_file}")
+        except OSError as e:
+            print(f"❌ Fehler beim Speichern von {output_file}: {e}")
+    
+    assert not failed, f"PDF Verarbeitung fehlgeschlagen: {', '.join(failed)}"
 
 
-def test_error_handling():
-    """Testet Fehlerbehandlung"""
-    print("\n" + "="*60)
-    print("TEST 5: Fehlerbehandlung")
-    print("="*60)
+def test_missing_file(processor_fast: DoclingProcessor):
+    """Testet Fehlerbehandlung bei fehlender Datei"""
+    banner("TEST 5: Fehlerbehandlung (fehlende Datei)")
     
-    processor = DoclingProcessor()
-    
-    # Test: Nicht existierende Datei
     try:
-        processor.convert_document("nicht_vorhanden.pdf")
-        print("❌ Fehlerbehandlung fehlgeschlagen")
+        processor_fast.convert_document("nicht_vorhanden.pdf")
     except ValueError as e:
+        assert str(e).startswith("Datei nicht gefunden"), e
         print(f"✅ Korrekte Fehlerbehandlung: {e}")
+    else:
+        raise AssertionError("Fehlerbehandlung fehlgeschlagen: kein ValueError")
+
+
+def test_invalid_format(processor_fast: DoclingProcessor):
+    """Testet die Format-Validierung (greift vor jedem Dateizugriff)"""
+    banner("TEST 6: Fehlerbehandlung (ungültiges Format)")
     
-    # Test: Ungültiges Format
     try:
-        # Erstelle ungültige Testdatei
-        with open("test.xyz", "w") as f:
-            f.write("test")
-        processor.convert_document("test.xyz")
-        print("❌ Format-Validierung fehlgeschlagen")
+        processor_fast.convert_document("nicht_vorhanden.xyz")
     except ValueError as e:
+        assert str(e).startswith("Nicht unterstütztes Format"), e
         print(f"✅ Format-Validierung korrekt: {str(e)[:50]}...")
-        Path("test.xyz").unlink()  # Aufräumen
+    else:
+        raise AssertionError("Format-Validierung fehlgeschlagen: kein ValueError")
 
 
 def run_all_tests():
     """Führt alle Tests aus"""
-    print("\n" + "#"*60)
-    print("# DOCLING PROCESSOR TEST SUITE")
-    print("#"*60)
+    banner("# DOCLING PROCESSOR TEST SUITE", "#")
     
-    # Testdateien erstellen
-    print("\nErstelle Testdateien...")
-    test_files = create_test_files()
+    # Höchstens zwei Processors: mit VLM und ohne (schneller)
+    proc_fast = get_processor(use_vlm=False)
+    proc_vlm = get_processor(use_vlm=True)
     
-    # Tests ausführen
-    try:
-        test_basic_conversion()
-        test_markdown_export()
-        test_error_handling()
-        test_pdf_with_ocr()
-        test_llm_qa()  # Am Ende, da es externe API braucht
+    # Unabhängige Tests parallel ausführen (I/O- und modellgebunden)
+    stdout = _ThreadStdout(sys.stdout)
+    
+    def run_captured(test, processor, *args):
+        stdout.capture()
+        try:
+            test(processor, *args)
+        except unittest.SkipTest as e:
+            print(f"⚠️  {test.__name__} übersprungen: {e}")
+        except Exception as e:
+            print(f"❌ {test.__name__} fehlgeschlagen: {e}")
+        return stdout.release()
+    
+    # Testdateien im Temp-Verzeichnis (meist tmpfs), wird mit dem Block gelöscht
+    with tempfile.TemporaryDirectory(prefix="docling_test_") as tmp_dir:
+        print("\nErstelle Testdateien...")
+        md_file, html_file = create_test_files(Path(tmp_dir))
         
-    finally:
-        # Aufräumen
-        print("\n" + "="*60)
-        print("Aufräumen...")
-        for file in test_files:
-            try:
-                Path(file).unlink()
-                print(f"✓ {file} gelöscht")
-            except:
-                pass
+        sys.stdout = stdout
+        try:
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                futures = [
+                    executor.submit(run_captured, test, processor, *args)
+                    for test, processor, *args in (
+                        # Nach VLM-Einstellung gruppiert: erst ohne, dann mit VLM
+                        (test_missing_file, proc_fast),
+                        (test_invalid_format, proc_fast),
+                        (test_markdown_export, proc_fast, html_file),
+                        (test_basic_conversion, proc_vlm, md_file, html_file),
+                        (test_pdf_with_ocr, proc_vlm),
+                    )
+                ]
+                for future in as_completed(futures):
+                    stdout.write(future.result())
+        finally:
+            sys.stdout = stdout._stream
+        
+        # Am Ende, da es externe API braucht
+        try:
+            test_llm_qa(proc_fast, md_file)
+        except unittest.SkipTest as e:
+            print(f"⚠️  test_llm_qa übersprungen: {e}")
+        except Exception as e:
+            print(f"❌ test_llm_qa fehlgeschlagen: {e}")
     
-    print("\n" + "#"*60)
-    print("# TESTS ABGESCHLOSSEN")
-    print("#"*60)
+    banner("# TESTS ABGESCHLOSSEN", "#")
     print("\nNächste Schritte:")
     print("1. Installieren Sie ein Ollama Modell für Q&A Tests:")
-    print("   ollama pull qwen3:latest")
+    print(f"   ollama pull {QA_MODEL}")
     print("2. Testen Sie mit einer echten PDF-Datei:")
     print("   python docling_processor.py --file ihre_datei.pdf")
     print("3. Aktivieren Sie Verbose-Mode für Details:")
@@ -257,37 +538,42 @@ def quick_test(file_path: str):
     print(f"\nSchnelltest mit: {file_path}")
     print("-"*40)
     
-    processor = DoclingProcessor(use_vlm=True)
+    processor = get_processor(use_vlm=True)
     
     try:
-        # Konvertieren
+        # Konvertieren und Frage stellen in einem Durchgang
         result = processor.process(
             file_path=file_path,
-            output_format="json"
+            output_format="json",
+            question=Q_MAIN_CONTENT,
+            model=QA_MODEL
         )
         
         print("✅ Verarbeitung erfolgreich!")
         print(f"Metadaten: {result['metadata']}")
         
-        # Mit Frage testen
-        result_qa = processor.process(
-            file_path=file_path,
-            output_format="json",
-            question="Was ist der Hauptinhalt dieses Dokuments?",
-            model="qwen3:latest"
-        )
-        
-        if 'qa' in result_qa:
-            print(f"Q&A Antwort: {result_qa['qa'].get('antwort', 'Keine Antwort')[:200]}...")
+        if 'qa' in result:
+            print(f"Q&A Antwort: {result['qa'].get('antwort', 'Keine Antwort')[:200]}...")
         
     except Exception as e:
         print(f"❌ Fehler: {e}")
 
 
 if __name__ == "__main__":
-    if len(sys.argv) > 1:
+    parser = argparse.ArgumentParser(description="Tests für den Docling Processor")
+    parser.add_argument("file", nargs="?", help="Schnelltest mit dieser Datei")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Q&A Antworten nicht aus .qa_cache.json lesen (z.B. in CI)")
+    parser.add_argument("--semantic-cache", action="store_true",
+                        help="Auch umformulierte Fragen aus dem Q&A Cache beantworten (sentence-transformers)")
+    args = parser.parse_args()
+    
+    if not args.no_cache:
+        qa_cache = SemanticQACache(Path(".qa_cache.json"), semantic=args.semantic_cache)
+    
+    if args.file:
         # Wenn Datei als Argument übergeben
-        quick_test(sys.argv[1])
+        quick_test(args.file)
     else:
         # Vollständige Testsuite
-        run_all_tests()
\ No newline at end of file
+        run_all_tests()